@@ -0,0 +1,65 @@
+"""
+Compares the vectorized FRD nodal block parser against the line by line parser
+on a synthetic block of 1 M nodes with 6 components.
+
+Run from the repository root: `python -m benchmarks.bench_frd_parser [result.frd ...]`
+With result files, every file is indexed and all its blocks are decoded instead.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ccx_runner.ccx_logic.result import FrdFile, parse_nodal_lines, parse_nodal_records
+
+N_NODES = 1_000_000
+N_COMPONENTS = 6
+
+
+def synthetic_block(n_nodes: int, n_components: int) -> list[str]:
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(n_nodes, n_components))
+    return [
+        f" -1{node + 1:10d}" + "".join(f"{value:12.5E}" for value in row)
+        for node, row in enumerate(values)
+    ]
+
+
+def read_files(paths: list[str]):
+    for path in paths:
+        start = time.perf_counter()
+        with FrdFile(Path(path)) as frd:
+            t_index = time.perf_counter() - start
+            values = sum(block.data.size for block in frd.blocks)
+            t_decode = time.perf_counter() - start - t_index
+            print(f"{path}: {len(frd.blocks)} blocks, {values:,} values")
+        print(f"  index:  {t_index:8.3f}s")
+        print(f"  decode: {t_decode:8.3f}s")
+
+
+def main():
+    if len(sys.argv) > 1:
+        read_files(sys.argv[1:])
+        return
+
+    lines = synthetic_block(N_NODES, N_COMPONENTS)
+    buffer = ("\n".join(lines) + "\n").encode("ascii")
+
+    start = time.perf_counter()
+    reference = parse_nodal_lines(lines)
+    t_lines = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = parse_nodal_records(buffer)
+    t_records = time.perf_counter() - start
+
+    assert data is not None and np.array_equal(reference, data)
+    print(f"line by line: {t_lines:8.3f}s")
+    print(f"vectorized:   {t_records:8.3f}s")
+    print(f"speedup:      {t_lines / t_records:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
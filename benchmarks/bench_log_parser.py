@@ -0,0 +1,79 @@
+"""
+Replays ccx logs through the solver status parser and reports the parsed lines per second,
+with and without keeping the raw lines.
+
+Run from the repository root: `python -m benchmarks.bench_log_parser [job.log ...]`
+Without log files, a synthetic static analysis log with 20 000 increments is replayed.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from ccx_runner.ccx_logic.status import CalculixStatus
+
+N_INCREMENTS = 20_000
+N_ITERATIONS = 5
+REPEATS = 3
+
+
+def synthetic_log(n_increments: int, n_iterations: int) -> list[str]:
+    lines = [" Static analysis was selected", ""]
+    for increment in range(1, n_increments + 1):
+        lines += [
+            f" increment {increment} attempt 1 ",
+            " increment size= 1.000000e-04",
+            " sum of previous increments=1.000000e-01",
+            " actual step time=1.000100e-01",
+            f" actual total time={increment * 1e-4:e}",
+            "",
+        ]
+        for iteration in range(1, n_iterations + 1):
+            lines += [
+                f" iteration {iteration}",
+                "",
+                " Using up to 4 cpu(s) for the symmetric stiffness/mass contributions.",
+                "",
+                " Factoring the system of equations using the symmetric spooles solver",
+                " Using up to 4 cpu(s) for spooles.",
+                "",
+                f" average force= {1 / iteration:f}",
+                f" time avg. forc= {1 / iteration:f}",
+                f" largest residual force= {1e-3 / iteration:f} in node 1234 and dof 2",
+                f" largest increment of disp= {1e-2 / iteration:e}",
+                f" largest correction to disp= {1e-4 / iteration:e} in node 77 and dof 1",
+                "",
+                " no convergence",
+                "",
+            ]
+        lines += [" convergence", ""]
+    return lines
+
+
+def replay(lines: list[str], keep_lines: bool) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        status = CalculixStatus(keep_lines=keep_lines)
+        start = time.perf_counter()
+        status.parse_lines(lines)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main():
+    if len(sys.argv) > 1:
+        lines = []
+        for path in sys.argv[1:]:
+            lines += Path(path).read_text(errors="replace").splitlines()
+        source = ", ".join(sys.argv[1:])
+    else:
+        lines = synthetic_log(N_INCREMENTS, N_ITERATIONS)
+        source = f"synthetic log, {N_INCREMENTS} increments"
+
+    print(f"{source}: {len(lines)} lines")
+    print(f"keeping lines: {replay(lines, True):12,.0f} lines/s")
+    print(f"skipping lines:{replay(lines, False):12,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
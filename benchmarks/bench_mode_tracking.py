@@ -0,0 +1,136 @@
+"""
+Compares the greedy mode chaining (first candidate above the MAC threshold, chain ends on the first miss)
+with the assignment based tracker on synthetic Campbell data with 200 modes and 100 speeds.
+
+The synthetic modes contain
+- branches with orthogonal shapes whose frequencies cross,
+- forward / backward whirl pairs that share the same (real) shape and only differ in frequency,
+- veering pairs whose frequencies approach and repel while their shapes rotate into each other.
+The solver output is sorted by frequency at every speed, like ccx does.
+
+Run from the repository root: `python -m benchmarks.bench_mode_tracking`
+"""
+
+import time
+
+import numpy as np
+
+from ccx_runner.ccx_logic.complex_modal.Eigenvector import mac_matrix
+from ccx_runner.ccx_logic.complex_modal.tracking import track_modes
+
+N_MODES = 200
+N_SPEEDS = 100
+N_DOF = 1000
+N_WHIRL_PAIRS = 40
+N_VEERING_PAIRS = 20
+NOISE = 0.01
+MIN_MAC = 0.8
+
+
+def synthetic_campbell(rng: np.random.Generator):
+    """
+    Returns per speed the mode shapes `(n_dof, n_modes)`, the frequencies and the true branch of every
+    mode (all sorted by frequency).
+    """
+    speeds = np.linspace(0.05, 1.0, N_SPEEDS)
+    basis, _ = np.linalg.qr(rng.normal(size=(N_DOF, N_MODES)))
+
+    base_frequencies = np.sort(rng.uniform(10, 1000, N_MODES))
+    slopes = rng.uniform(-150, 150, N_MODES)
+
+    # branch -> (frequency curve, shape curve) as functions of the speed
+    frequency = np.empty((N_SPEEDS, N_MODES))
+    shapes = np.empty((N_SPEEDS, N_DOF, N_MODES))
+    frequency[:] = base_frequencies + np.outer(speeds, slopes)
+    shapes[:] = basis
+
+    branches = rng.permutation(N_MODES)
+    whirl = branches[: 2 * N_WHIRL_PAIRS].reshape(-1, 2)
+    veering = branches[2 * N_WHIRL_PAIRS : 2 * (N_WHIRL_PAIRS + N_VEERING_PAIRS)].reshape(-1, 2)
+
+    for forward, backward in whirl:
+        split = rng.uniform(20, 100)
+        frequency[:, forward] = base_frequencies[forward] + split * speeds
+        frequency[:, backward] = base_frequencies[forward] - split * speeds
+        shapes[:, :, backward] = basis[:, [forward]].T
+
+    for lower, upper in veering:
+        center = base_frequencies[lower] + rng.uniform(-100, 100) * speeds
+        detuning = rng.uniform(50, 150) * (speeds - rng.uniform(0.3, 0.7))
+        coupling = rng.uniform(2, 8)
+        half_gap = np.sqrt(detuning**2 + coupling**2)
+        frequency[:, lower] = center - half_gap
+        frequency[:, upper] = center + half_gap
+        angle = 0.5 * np.arctan2(coupling, detuning)
+        q_1, q_2 = basis[:, lower], basis[:, upper]
+        shapes[:, :, lower] = np.outer(np.cos(angle), q_1) + np.outer(np.sin(angle), q_2)
+        shapes[:, :, upper] = -np.outer(np.sin(angle), q_1) + np.outer(np.cos(angle), q_2)
+
+    shapes += NOISE * rng.normal(size=shapes.shape) / np.sqrt(N_DOF)
+
+    order = np.argsort(frequency, axis=1)
+    sorted_shapes = [shapes[i][:, order[i]] for i in range(N_SPEEDS)]
+    sorted_frequencies = [frequency[i][order[i]] for i in range(N_SPEEDS)]
+    return sorted_shapes, sorted_frequencies, list(order)
+
+
+def track_modes_greedy(macs: list[np.ndarray], min_mac: float) -> list[list[int]]:
+    chains = [[mode] for mode in range(macs[0].shape[0])]
+    for mac in macs:
+        for chain in chains:
+            if chain[-1] == -1:
+                chain.append(-1)
+                continue
+            candidates = np.flatnonzero(mac[chain[-1]] > min_mac)
+            chain.append(int(candidates[0]) if len(candidates) else -1)
+    return chains
+
+
+def accuracy(chains: list[list[int]], branches: list[np.ndarray]) -> float:
+    """
+    Fraction of the true links between neighbouring speeds that are reproduced by the chains.
+    """
+    correct = 0
+    for step in range(N_SPEEDS - 1):
+        position = np.argsort(branches[step + 1])
+        true_links = {
+            (mode, int(position[branch])) for mode, branch in enumerate(branches[step])
+        }
+        links = {
+            (chain[step], chain[step + 1])
+            for chain in chains
+            if chain[step] != -1 and chain[step + 1] != -1
+        }
+        correct += len(true_links & links)
+    return correct / (N_MODES * (N_SPEEDS - 1))
+
+
+def main():
+    rng = np.random.default_rng(0)
+    shapes, frequencies, branches = synthetic_campbell(rng)
+
+    start = time.perf_counter()
+    macs = [mac_matrix(shapes[i], shapes[i + 1]) for i in range(N_SPEEDS - 1)]
+    t_mac = time.perf_counter() - start
+    print(f"MAC matrices ({N_SPEEDS - 1} x {N_MODES}x{N_MODES}): {t_mac:.3f}s")
+
+    trackers = {
+        "greedy (MAC > 0.999999)": lambda: track_modes_greedy(macs, 0.999999),
+        "greedy": lambda: track_modes_greedy(macs, MIN_MAC),
+        "assignment (MAC only)": lambda: track_modes(
+            macs, frequencies, MIN_MAC, frequency_weight=0.0
+        ),
+        "assignment": lambda: track_modes(macs, frequencies, MIN_MAC),
+    }
+    for name, tracker in trackers.items():
+        start = time.perf_counter()
+        chains = tracker()
+        runtime = time.perf_counter() - start
+        print(
+            f"{name:24s} accuracy {100 * accuracy(chains, branches):6.2f}%"
+            f"   runtime {runtime:7.3f}s   chains {len(chains)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
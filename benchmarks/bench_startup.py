@@ -0,0 +1,80 @@
+"""
+Measures the startup of the GUI and the headless CLI in fresh interpreters:
+- the import time of the startup path, from `python -X importtime`, with the slowest modules,
+- the time from starting the interpreter until the GUI has rendered its first frame
+  (needs dearpygui and a display), compared to `TARGET_FIRST_FRAME`.
+
+Run from the repository root: `python -m benchmarks.bench_startup`
+"""
+
+import subprocess
+import sys
+import time
+
+TARGET_FIRST_FRAME = 1.0  # [s]
+REPEATS = 5
+N_SLOWEST = 8
+
+STARTUP_IMPORTS = {
+    "GUI": "import ccx_runner.main, ccx_runner.gui.hauptfenster",
+    "CLI": "import ccx_runner.main, ccx_runner.cli",
+}
+FIRST_FRAME = "from ccx_runner.main import gui; gui(frames=1)"
+
+
+def import_times(code: str) -> tuple[float, list[tuple[float, str]]]:
+    """
+    Total import time [s] and the cumulative import time of every module.
+    Raises `subprocess.CalledProcessError` if the imports fail.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    total = 0.0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.partition(":")[2].split("|")
+        seconds = int(cumulative) / 1e6
+        modules.append((seconds, name.strip()))
+        if not name.startswith("  "):  # top level import
+            total += seconds
+    return total, modules
+
+
+def first_frame_time() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", FIRST_FRAME], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def main():
+    for label, code in STARTUP_IMPORTS.items():
+        try:
+            runs = [import_times(code) for _ in range(REPEATS)]
+        except subprocess.CalledProcessError as error:
+            print(f"{label}: imports failed\n{error.stderr.strip().splitlines()[-1]}")
+            continue
+        total, modules = min(runs, key=lambda run: run[0])
+        print(f"{label} imports: {total * 1000:8.1f}ms")
+        for seconds, name in sorted(modules, reverse=True)[:N_SLOWEST]:
+            print(f"    {seconds * 1000:8.1f}ms  {name}")
+
+    try:
+        t_first_frame = min(first_frame_time() for _ in range(REPEATS))
+    except subprocess.CalledProcessError:
+        print("first frame: skipped (dearpygui or a display is not available)")
+        return
+    verdict = "ok" if t_first_frame <= TARGET_FIRST_FRAME else "too slow"
+    print(
+        f"first frame: {t_first_frame * 1000:8.1f}ms"
+        f" (target {TARGET_FIRST_FRAME * 1000:.0f}ms, {verdict})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,113 @@
 from ccx_runner.ccx_logic.result import ResultBlock
+from ccx_runner.ccx_logic.complex_modal.NodeIndex import NodeIndex
 
 import numpy as np
+from typing import Optional
 
 
 class Eigenvector:
-    def __init__(self, result: ResultBlock) -> None:
+    def __init__(
+        self,
+        step: int,
+        mode_nr: int,
+        eigenfrequency: float,
+        data: Optional[np.ndarray] = None,
+        result: Optional[ResultBlock] = None,
+    ) -> None:
+        """
+        An eigenvector either reads its data from a `ResultBlock` or holds an already parsed (e.g. cached) array.
+        """
+        self.step = step
+        self.mode_nr = mode_nr
+        self.eigenfrequency = eigenfrequency
         self.result = result
+        self._data = data
+        self.node_index: Optional[NodeIndex] = None
 
     def __repr__(self) -> str:
         return f"({self.step}) Mode {self.mode_nr} [{self.eigenfrequency} Hz]"
 
     @property
-    def step(self):
-        return int(self.result.header["100CL"][3])
-
-    @property
-    def eigenfrequency(self):
-        return float(self.result.header["100CL"][1])
-
-    @property
-    def mode_nr(self):
-        return int(self.result.header["1PMODE"][0])
+    def data(self) -> np.ndarray:
+        if self._data is None:
+            if self.result is None:
+                raise ValueError("The eigenvector has neither data nor a result block.")
+            return self.result.data
+        return self._data
+
+    def align(self, node_index: NodeIndex):
+        """
+        Stores the data permuted into the canonical node order of `node_index`. For a subset index, only
+        the rows of its nodes are decoded from the result block.
+        """
+        if node_index.is_subset and self._data is None and self.result is not None:
+            data = self.result.subset_data(node_index.node_ids)
+        else:
+            data = self.data
+        self._data = node_index.align(data)
+        self.node_index = node_index
 
-    @property
-    def data(self):
-        return self.result.data
+    @staticmethod
+    def from_result_block(res: ResultBlock) -> "Eigenvector":
+        return Eigenvector(
+            step=int(res.header["100CL"][3]),
+            mode_nr=int(res.header["1PMODE"][0]),
+            eigenfrequency=float(res.header["100CL"][1]),
+            result=res,
+        )
 
     @staticmethod
     def from_result_blocks(results: list[ResultBlock]):
         eigenvectors: list["Eigenvector"] = []
         for res in results:
             if res.output_type == "DISP" and "1PMODE" in tuple(res.header.keys()):
-                eigenvectors.append(Eigenvector(res))
+                eigenvectors.append(Eigenvector.from_result_block(res))
         return eigenvectors
 
-    def mac(self, other: "Eigenvector") -> float:
-        r"""
-        Compute the Modal Assurance Criterion. This assigns a scalar value between 0 and 1 which
-        describes the similarity between the two node shapes. This is needed to correctly identify
-        the same node shapes between different simulations.
-
-        $$
-        \text{MAC}(\{\phi_A\}, \{\phi_B\}) = \frac{|(\{\phi_A\}^T \{\phi_B\})|^2}{(\{\phi_A\}^T \{\phi_A\}) (\{\phi_B\}^T \{\phi_B\})}
-        $$
-        """
-        mode_1_data = self.data
-        mode_2_data = other.data
-
-        sort_indices = mode_1_data[:, 0].argsort()
-
-        sorted_1 = mode_1_data[sort_indices]
-        sorted_2 = mode_2_data[sort_indices]
-
-        # Sicherheitscheck (optional, aber empfohlen)
-        # Stellt sicher, dass die Knoten-IDs jetzt wirklich übereinstimmen
-        assert np.array_equal(
-            sorted_1[:, 0], sorted_2[:, 0]
-        ), "Knoten-IDs stimmen nach Sortierung nicht überein!"
-
-        flattened_1 = sorted_1[:, 1:].flatten()
-        flattened_2 = sorted_2[:, 1:].flatten()
-
-        numerator = np.abs(np.dot(flattened_1, flattened_2)) ** 2
-        denominator = np.dot(flattened_1, flattened_1) * np.dot(
-            flattened_2, flattened_2
-        )
 
-        mac_value = 0.0
-        if denominator > 1e-12:  # Avoid Zero Division
-            mac_value = numerator / denominator
-        return mac_value
+def stack_mode_shapes(eigenvectors: list[Eigenvector]) -> np.ndarray:
+    """
+    Stacks the mode shapes of one analysis step as columns of a `(n_dof, n_modes)` matrix.
+    All eigenvectors have to be aligned to the same `NodeIndex`, so the rows of stacks from
+    different steps correspond to each other.
+    """
+    if not eigenvectors:
+        return np.empty((0, 0))
+
+    node_index = eigenvectors[0].node_index
+    shapes = np.empty(
+        (eigenvectors[0].data[:, 1:].size, len(eigenvectors)),
+        dtype=np.result_type(*(vec.data.dtype for vec in eigenvectors)),
+        order="F",
+    )
+    for column, vec in enumerate(eigenvectors):
+        if node_index is None or vec.node_index is not node_index:
+            raise ValueError(f"{vec} is not aligned to the node index of its step.")
+        shapes[:, column] = vec.data[:, 1:].ravel()
+    return shapes
+
+
+def mac_matrix(shapes_a: np.ndarray, shapes_b: np.ndarray) -> np.ndarray:
+    r"""
+    Computes the Modal Assurance Criterion of every mode in `shapes_a` with every mode in `shapes_b` at once.
+    Both are `(n_dof, n_modes)` matrices of mode shapes with identically ordered rows (see `stack_mode_shapes`).
+
+    $$
+    \text{MAC} = \frac{|A^H B|^2}{\text{diag}(A^H A) \otimes \text{diag}(B^H B)}
+    $$
+    """
+    conj_a = shapes_a.conj() if np.iscomplexobj(shapes_a) else shapes_a
+    conj_b = shapes_b.conj() if np.iscomplexobj(shapes_b) else shapes_b
+
+    numerator = np.abs(conj_a.T @ shapes_b) ** 2
+    denominator = np.outer(
+        np.einsum("ij,ij->j", conj_a, shapes_a).real,
+        np.einsum("ij,ij->j", conj_b, shapes_b).real,
+    )
+    # Avoid Zero Division
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros(numerator.shape),
+        where=denominator > 1e-12,
+    )
@@ -0,0 +1,136 @@
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import platformdirs
+
+from ccx_runner.ccx_logic.complex_modal.Eigenvector import Eigenvector
+
+
+class EigenvectorCache:
+    """
+    Persistent cache of parsed eigenvector arrays in the users cache directory.
+
+    Every mode is stored as its own `.npy` file, keyed by the result it was read from (e.g. the analysis and
+    speed step, see `CampbellAnalysis.cache_key`), the step and the mode number. The key has to stay the
+    same as long as the result does: a content hash of the `.frd` file would not, ccx writes the date and
+    time into it. A small JSON index per result and step lists the cached modes with their eigenfrequencies
+    and tells whether they only hold a node subset.
+    Arrays are loaded memory mapped, so a cache hit costs (almost) no parsing and no memory.
+    The least recently used entries are evicted once the total size exceeds `max_size` bytes.
+    """
+
+    def __init__(
+        self, cache_dir: Optional[Path] = None, max_size: int = 10 * 1024**3
+    ) -> None:
+        if cache_dir is None:
+            cache_dir = Path(platformdirs.user_cache_dir("ccx_runner")) / "eigenvectors"
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _index_path(self, key: str, step: int, variant: str) -> Path:
+        return self.cache_dir / f"{key}_{step}{variant}.json"
+
+    def _mode_path(self, key: str, step: int, mode_nr: int, variant: str) -> Path:
+        return self.cache_dir / f"{key}_{step}_{mode_nr}{variant}.npy"
+
+    def load(
+        self, key: str, step: int, variant: str = ""
+    ) -> Optional[tuple[list[Eigenvector], bool]]:
+        """
+        Returns the cached eigenvectors of a step and whether they only hold a node subset, or `None` if
+        they are not (completely) cached. `variant` distinguishes different extracts of the same modes
+        (e.g. node subsets).
+        """
+        index_path = self._index_path(key, step, variant)
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            modes: dict[str, float] = index["modes"]
+            is_subset = bool(index["is_subset"])
+
+            eigenvectors: list[Eigenvector] = []
+            for mode_nr, eigenfrequency in modes.items():
+                mode_path = self._mode_path(key, step, int(mode_nr), variant)
+                data = np.load(mode_path, mmap_mode="r")
+                os.utime(mode_path)  # mark as recently used
+                eigenvectors.append(
+                    Eigenvector(step, int(mode_nr), eigenfrequency, data=data)
+                )
+            os.utime(index_path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None  # also an index from an older version
+        return eigenvectors, is_subset
+
+    def store(
+        self,
+        key: str,
+        step: int,
+        eigenvectors: list[Eigenvector],
+        variant: str = "",
+        is_subset: bool = False,
+    ):
+        """
+        Writes the eigenvectors of a step to the cache and evicts old entries if needed.
+        """
+        for vec in eigenvectors:
+            np.save(self._mode_path(key, step, vec.mode_nr, variant), vec.data)
+
+        # The index is written last, so an interrupted store never looks like a cache hit
+        index_path = self._index_path(key, step, variant)
+        temp_path = index_path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(
+                {
+                    "is_subset": is_subset,
+                    "modes": {vec.mode_nr: vec.eigenfrequency for vec in eigenvectors},
+                },
+                f,
+            )
+        os.replace(temp_path, index_path)
+
+        self.evict()
+
+    def _entries(self) -> list[tuple[Path, os.stat_result]]:
+        """
+        The cached files with their stats. Several processes share the cache, so files can disappear
+        (evicted by another one) while they are listed.
+        """
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            try:
+                entries.append((entry, entry.stat()))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    @property
+    def size(self) -> int:
+        return sum(stat.st_size for _, stat in self._entries())
+
+    def evict(self):
+        """
+        Deletes the least recently used files until the cache fits into `max_size`.
+        """
+        entries = self._entries()
+        total_size = sum(stat.st_size for _, stat in entries)
+        for entry, stat in sorted(entries, key=lambda item: item[1].st_mtime):
+            if total_size <= self.max_size:
+                break
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass  # evicted by another process
+            except OSError:
+                continue  # still memory mapped somewhere (Windows)
+            total_size -= stat.st_size
+
+    def clear(self):
+        for entry in self.cache_dir.iterdir():
+            try:
+                entry.unlink()
+            except OSError:
+                pass
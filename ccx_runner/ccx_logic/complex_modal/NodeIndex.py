@@ -0,0 +1,87 @@
+import hashlib
+
+import numpy as np
+from typing import Optional
+
+
+class NodeIndex:
+    """
+    Canonical node order of a mesh, built once and shared by all eigenvectors of an analysis
+    (every speed step of a Campbell analysis uses the same mesh). It maps node IDs to rows, so the mode
+    shapes can be stored already permuted into the same order and compared without any sorting.
+
+    If `is_subset` is set, the index only covers a part of the mesh. Eigenvectors then hold the rows of
+    these nodes only, which is enough to identify modes by their MAC.
+    """
+
+    def __init__(self, node_ids: np.ndarray, is_subset: bool = False) -> None:
+        self.node_ids = np.sort(np.asarray(node_ids).astype(np.int64))
+        if np.any(np.diff(self.node_ids) == 0):
+            raise ValueError("The node IDs of a mesh must be unique.")
+        self.is_subset = is_subset
+
+        # The node order of the last aligned array, consecutive arrays usually share it
+        self._last_ids: Optional[np.ndarray] = None
+        self._last_rows: Optional[np.ndarray] = None
+
+    def __getstate__(self) -> dict:
+        # the node order of the last aligned array is not worth sending to another process
+        return {**self.__dict__, "_last_ids": None, "_last_rows": None}
+
+    @staticmethod
+    def sample(node_ids: np.ndarray, size: int, seed: int = 0) -> "NodeIndex":
+        """
+        Index of a deterministic random subset of `size` nodes, spread over the whole mesh.
+        The same mesh, size and seed always give the same subset.
+        """
+        node_ids = np.sort(np.asarray(node_ids).astype(np.int64))
+        if size >= len(node_ids):
+            return NodeIndex(node_ids)
+        rng = np.random.default_rng(seed)
+        return NodeIndex(rng.choice(node_ids, size, replace=False), is_subset=True)
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def digest(self) -> str:
+        """
+        Short hash of the node IDs, identifies the nodes a (subset) index covers.
+        """
+        return hashlib.blake2b(self.node_ids.tobytes(), digest_size=8).hexdigest()
+
+    def rows(self, node_ids: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Returns the canonical row of every given node ID, or `None` if they already are in canonical order.
+        Raises a `ValueError` if the IDs are not a permutation of the mesh nodes.
+        """
+        node_ids = np.asarray(node_ids).astype(np.int64)
+        if self._last_ids is not None and np.array_equal(node_ids, self._last_ids):
+            return self._last_rows
+
+        if len(node_ids) != len(self):
+            raise ValueError(
+                f"Expected {len(self)} nodes, got {len(node_ids)}. The meshes differ."
+            )
+        rows: Optional[np.ndarray] = None
+        if not np.array_equal(node_ids, self.node_ids):
+            rows = np.searchsorted(self.node_ids, node_ids).clip(max=len(self) - 1)
+            covered = np.zeros(len(self), dtype=bool)
+            covered[rows] = True
+            if not (np.array_equal(self.node_ids[rows], node_ids) and covered.all()):
+                raise ValueError("The node IDs do not match the mesh of the analysis.")
+
+        self._last_ids, self._last_rows = node_ids, rows
+        return rows
+
+    def align(self, data: np.ndarray) -> np.ndarray:
+        """
+        Returns a `(node, comp...)` array with its rows permuted into canonical order.
+        Arrays that already are in canonical order are returned as they are, without a copy.
+        """
+        rows = self.rows(data[:, 0])
+        if rows is None:
+            return data
+        aligned = np.empty(data.shape, dtype=data.dtype)
+        aligned[rows] = data
+        return aligned
@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import Optional
+
+from ccx_runner.ccx_logic.complex_modal.Eigenvector import Eigenvector
+from ccx_runner.ccx_logic.complex_modal.EigenvectorCache import EigenvectorCache
+from ccx_runner.ccx_logic.complex_modal.NodeIndex import NodeIndex
+from ccx_runner.ccx_logic.result import FrdFile
+
+
+def cache_variant(node_index: Optional[NodeIndex]) -> str:
+    """
+    Node subsets are cached separately from the full fields, each under the digest of its nodes.
+    """
+    if node_index is None or not node_index.is_subset:
+        return ""
+    return f"subset{node_index.digest}"
+
+
+def cached_modes(
+    cache: EigenvectorCache,
+    key: str,
+    step: int,
+    variant: str = "",
+    node_index: Optional[NodeIndex] = None,
+) -> tuple[Optional[list[Eigenvector]], Optional[NodeIndex]]:
+    """
+    Loads the modes of a step from the cache (memory mapped), aligned to `node_index`. If it is `None`,
+    the index is built from the cached node IDs. Returns `None` as modes if they are not cached.
+    """
+    cached = cache.load(key, step, variant)
+    if not cached or not cached[0]:
+        return None, node_index
+    eigenvectors, is_subset = cached
+    if node_index is None:
+        node_index = NodeIndex(eigenvectors[0].data[:, 0], is_subset=is_subset)
+    for vec in eigenvectors:
+        vec.align(node_index)
+    return eigenvectors, node_index
+
+
+def read_modes(
+    frd_path: Path,
+    step: int,
+    cache: Optional[EigenvectorCache] = None,
+    cache_key: Optional[str] = None,
+    node_index: Optional[NodeIndex] = None,
+    node_subset_size: int = 0,
+) -> tuple[list[Eigenvector], Optional[NodeIndex]]:
+    """
+    Reads the modes of a step from a result file, or from the cache if it holds them under `cache_key`.
+    They get aligned to `node_index`, which should be shared by all speed steps of an analysis. If it is
+    `None`, a new one is built from the first mode, covering a random subset of `node_subset_size` nodes
+    (0 = all nodes). Returns the modes and the node index.
+    The cache is only looked up with a given `node_index`, as the cached variant depends on its nodes.
+    """
+    use_cache = cache is not None and cache_key is not None
+    eigenvectors = None
+    if use_cache and node_index is not None:
+        eigenvectors, node_index = cached_modes(
+            cache, cache_key, step, cache_variant(node_index), node_index  # type: ignore
+        )
+
+    if eigenvectors is None:
+        # Extract the modes from the Results file. Only the blocks of the modes get decoded
+        # (or just the rows of the node subset), before the memory map gets closed again.
+        with FrdFile(frd_path) as frd:
+            eigenvectors = [
+                vec for vec in Eigenvector.from_result_blocks(frd.blocks) if vec.step == step
+            ]
+            if eigenvectors and node_index is None:
+                node_ids = eigenvectors[0].result.node_ids()  # type: ignore
+                if node_subset_size:
+                    node_index = NodeIndex.sample(node_ids, node_subset_size)
+                else:
+                    node_index = NodeIndex(node_ids)
+            for vec in eigenvectors:
+                vec.align(node_index)  # type: ignore
+                vec.result = None  # the memory map is closed below
+
+        if use_cache:
+            variant = cache_variant(node_index)
+            is_subset = node_index is not None and node_index.is_subset
+            cache.store(cache_key, step, eigenvectors, variant, is_subset)  # type: ignore
+            # Continue with the memory mapped arrays instead of keeping the parsed ones
+            cached, _ = cached_modes(cache, cache_key, step, variant, node_index)  # type: ignore
+            eigenvectors = cached or eigenvectors
+
+    return eigenvectors, node_index
+
+
+def cache_modes(
+    frd_path: Path,
+    step: int,
+    cache_dir: Path,
+    cache_key: str,
+    node_index: Optional[NodeIndex] = None,
+    node_subset_size: int = 0,
+) -> Optional[NodeIndex]:
+    """
+    Reads the modes of a result file into the cache at `cache_dir`, for worker processes. Only the new node
+    index (if none was given) is sent back, the modes are then loaded memory mapped from the cache
+    (see `read_modes`).
+    """
+    cache = EigenvectorCache(cache_dir)
+    _, new_index = read_modes(frd_path, step, cache, cache_key, node_index, node_subset_size)
+    return new_index if node_index is None else None
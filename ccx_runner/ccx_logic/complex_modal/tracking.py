@@ -0,0 +1,140 @@
+import numpy as np
+from typing import Sequence
+
+# Forward and backward whirl modes share their (real) shape, only the frequency tells them apart
+DEFAULT_FREQUENCY_WEIGHT = 1.0
+
+
+def linear_sum_assignment(cost: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Solves the linear assignment problem for a (rectangular) cost matrix with the Hungarian method
+    (shortest augmenting paths with dual potentials). Returns the row and column indices of the
+    `min(n_rows, n_cols)` pairs with the lowest total cost, like `scipy.optimize.linear_sum_assignment`.
+
+    Rows whose cheapest column is still free are assigned greedily first. For MAC based costs this
+    already solves almost every row, only the remaining ones need an augmenting path search.
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n_rows, n_cols = cost.shape
+    if n_rows == 0:
+        return np.array([], dtype=int), np.array([], dtype=int)
+
+    # Index 0 of the column arrays is a virtual column holding the row that is currently added.
+    # Rows are numbered from 1 in `row_of_col`, 0 means unassigned.
+    u = np.zeros(n_rows + 1)
+    v = np.zeros(n_cols + 1)
+    row_of_col = np.zeros(n_cols + 1, dtype=int)
+    way = np.zeros(n_cols + 1, dtype=int)
+
+    # Greedy start on tight edges: u = row minimum and v = 0 are feasible potentials
+    u[1:] = cost.min(axis=1)
+    unassigned: list[int] = []
+    for row, col in enumerate(cost.argmin(axis=1), start=1):
+        if row_of_col[col + 1] == 0:
+            row_of_col[col + 1] = row
+        else:
+            unassigned.append(row)
+
+    for row in unassigned:
+        row_of_col[0] = row
+        col = 0
+        min_dist = np.full(n_cols + 1, np.inf)
+        used = np.zeros(n_cols + 1, dtype=bool)
+        while row_of_col[col] != 0:
+            used[col] = True
+            current_row = row_of_col[col]
+            free = ~used[1:]
+            reduced = cost[current_row - 1] - u[current_row] - v[1:]
+            closer = free & (reduced < min_dist[1:])
+            min_dist[1:][closer] = reduced[closer]
+            way[1:][closer] = col
+
+            candidates = np.where(free, min_dist[1:], np.inf)
+            next_col = int(candidates.argmin()) + 1
+            delta = candidates[next_col - 1]
+
+            u[row_of_col[used]] += delta
+            v[used] -= delta
+            min_dist[~used] -= delta
+            col = next_col
+
+        # Flip the assignments along the augmenting path
+        while col != 0:
+            previous_col = way[col]
+            row_of_col[col] = row_of_col[previous_col]
+            col = previous_col
+
+    cols = np.flatnonzero(row_of_col[1:])
+    rows = row_of_col[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def tracking_cost(
+    macs: np.ndarray,
+    frequencies_1: np.ndarray,
+    frequencies_2: np.ndarray,
+    frequency_weight: float = DEFAULT_FREQUENCY_WEIGHT,
+) -> np.ndarray:
+    """
+    Cost of linking the modes of one speed step (rows) to the modes of the next one (columns):
+    `1 - MAC`, plus the relative frequency difference scaled by `frequency_weight`.
+    """
+    cost = 1.0 - macs
+    if frequency_weight:
+        f_1 = np.asarray(frequencies_1, dtype=float)[:, None]
+        f_2 = np.asarray(frequencies_2, dtype=float)[None, :]
+        scale = np.maximum(np.maximum(np.abs(f_1), np.abs(f_2)), 1e-12)
+        cost = cost + frequency_weight * np.abs(f_1 - f_2) / scale
+    return cost
+
+
+def track_modes(
+    macs: Sequence[np.ndarray],
+    frequencies: Sequence[np.ndarray],
+    min_mac: float = 0.9,
+    frequency_weight: float = DEFAULT_FREQUENCY_WEIGHT,
+) -> list[list[int]]:
+    """
+    Follows the modes through consecutive speed steps. `macs[i]` is the MAC matrix between the modes of
+    step `i` (rows) and step `i + 1` (columns), `frequencies[i]` holds the eigenfrequencies of step `i`.
+
+    The modes of two neighbouring steps are linked by an optimal assignment, so modes near crossings and
+    veerings are not lost to the first candidate that happens to match. Links with a MAC below `min_mac`
+    are rejected. Modes without a predecessor start a new chain.
+
+    Returns the chains as lists of mode indices (one entry per step, -1 where the chain has no mode).
+    """
+    chains: list[list[int]] = [[mode] for mode in range(len(frequencies[0]))]
+    # chain that ends in each mode of the current step
+    chain_of_mode = list(range(len(frequencies[0])))
+
+    for step, mac in enumerate(macs, start=1):
+        n_modes = len(frequencies[step])
+        cost = tracking_cost(mac, frequencies[step - 1], frequencies[step], frequency_weight)
+        rows, cols = linear_sum_assignment(cost)
+
+        next_chain_of_mode = [-1] * n_modes
+        for row, col in zip(rows, cols):
+            if mac[row, col] >= min_mac:
+                next_chain_of_mode[col] = chain_of_mode[row]
+
+        for mode in range(n_modes):
+            if next_chain_of_mode[mode] == -1:
+                # A new chain begins
+                next_chain_of_mode[mode] = len(chains)
+                chains.append([-1] * step)
+        for mode, chain in enumerate(next_chain_of_mode):
+            chains[chain].append(mode)
+        for chain in chains:
+            if len(chain) <= step:
+                chain.append(-1)  # The chain has ended
+
+        chain_of_mode = next_chain_of_mode
+
+    return chains
@@ -0,0 +1,50 @@
+import re
+from typing import Iterator, Optional
+
+# ccx announces every new step with this line
+STEP_SELECTED = r"(Static|Dynamic) analysis was selected[ \t]*$"
+
+
+class LineDispatcher:
+    """
+    Routes solver log lines to handlers with one pre-compiled regex.
+    `rules` maps handler names to patterns, which are combined into one alternation of named groups and
+    matched at the start of a line (leading whitespace is skipped). The named group that matched tells
+    the handler, the groups of its pattern are the handler arguments.
+    Patterns must only use unnamed groups and must not match across line ends (use `[ \\t]`, not `\\s`).
+    """
+
+    def __init__(self, rules: dict[str, str]) -> None:
+        alternatives = "|".join(f"(?P<{name}>{pattern})" for name, pattern in rules.items())
+        self.regex = re.compile(rf"^[ \t]*(?:{alternatives})", re.MULTILINE)
+        # position of the own groups of every rule in `match.groups()`
+        self._arguments: dict[str, slice] = {}
+        for name, pattern in rules.items():
+            index = self.regex.groupindex[name]
+            self._arguments[name] = slice(index, index + re.compile(pattern).groups)
+
+    def _handler(self, match: re.Match) -> tuple[str, tuple[str, ...]]:
+        name: str = match.lastgroup  # type: ignore
+        return name, match.groups()[self._arguments[name]]
+
+    def match(self, line: str) -> Optional[tuple[str, tuple[str, ...]]]:
+        """
+        The name of the handler of a line and its arguments, `None` if no rule matches.
+        """
+        match = self.regex.match(line)
+        return None if match is None else self._handler(match)
+
+    def scan(self, text: str, position: int = 0) -> Iterator[tuple[str, tuple[str, ...], int]]:
+        """
+        Handler name, arguments and end position of all matching lines of a (multi line) text,
+        from `position` on. Lines without a match never reach Python.
+        """
+        for match in self.regex.finditer(text, position):
+            yield *self._handler(match), match.end()
+
+
+def step_dispatcher(rules: dict[str, str]) -> LineDispatcher:
+    """
+    Dispatcher for the lines of a step, which also recognizes the start of the next step (`select_step`).
+    """
+    return LineDispatcher({"select_step": STEP_SELECTED, **rules})
@@ -0,0 +1,101 @@
+import numpy as np
+from typing import Any, Optional
+
+
+class GrowableArray:
+    """
+    1D NumPy array that grows by appending. The capacity doubles when it is exhausted, so appending
+    costs amortized O(1). `view` returns the filled part without copying; a view taken before the array
+    grew keeps showing the old values.
+    """
+
+    __slots__ = ("_data", "_size", "fill_value")
+
+    def __init__(self, dtype: Any = np.float64, capacity: int = 64, fill_value: Any = 0) -> None:
+        self._data = np.full(capacity, fill_value, dtype=dtype)
+        self._size = 0
+        self.fill_value = fill_value
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index):
+        return self.view[index]
+
+    def __setitem__(self, index, value):
+        self.view[index] = value
+
+    @property
+    def view(self) -> np.ndarray:
+        return self._data[: self._size]
+
+    def resize(self, size: int):
+        """
+        Grows (with `fill_value`) or shrinks the array to `size` entries.
+        """
+        if size > len(self._data):
+            data = np.full(
+                max(size, 2 * len(self._data)), self.fill_value, dtype=self._data.dtype
+            )
+            data[: self._size] = self._data[: self._size]
+            self._data = data
+        elif size < self._size:
+            self._data[size : self._size] = self.fill_value
+        self._size = size
+
+    def set_last(self, value):
+        self._data[self._size - 1] = value
+
+    def append(self, value):
+        if self._size == len(self._data):
+            self.resize(self._size + 1)
+        else:
+            self._size += 1
+        self._data[self._size - 1] = value
+
+
+class ColumnStore:
+    """
+    Table of named, equally long columns, each one a `GrowableArray`.
+    Columns can be added at any time, their earlier rows are filled with NaN (float columns) or -1.
+    """
+
+    def __init__(self, columns: Optional[dict[str, Any]] = None) -> None:
+        self.columns: dict[str, GrowableArray] = {}
+        self._size = 0
+        for name, dtype in (columns or {}).items():
+            self.add_column(name, dtype)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add_column(self, name: str, dtype: Any = np.float64):
+        fill_value = np.nan if np.issubdtype(dtype, np.floating) else -1
+        column = GrowableArray(dtype, fill_value=fill_value)
+        column.resize(self._size)
+        self.columns[name] = column
+
+    def append_row(self, values: dict[str, Any]):
+        """
+        Appends a row, columns missing from `values` get their fill value.
+        """
+        for name, column in self.columns.items():
+            column.append(values.get(name, column.fill_value))
+        self._size += 1
+
+    def set_last(self, name: str, value: Any):
+        """
+        Sets a value of the last row, a new float column is added if needed.
+        """
+        if name not in self.columns:
+            self.add_column(name)
+        self.columns[name].set_last(value)
+
+    def column(self, name: str, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """
+        Zero copy view of (a part of) a column.
+        """
+        return self.columns[name].view[start:stop]
+
+    def row(self, index: int) -> dict[str, Any]:
+        return {name: column[index].item() for name, column in self.columns.items()}
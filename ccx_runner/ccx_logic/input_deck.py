@@ -0,0 +1,533 @@
+import mmap
+import os
+import re
+import shutil
+from functools import cached_property
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+# A keyword line starts with "*", comments with "**". Searching for the line break first is
+# an order of magnitude faster than a multiline "^".
+KEYWORD_LINE = re.compile(rb"\n([ \t]*\*(?!\*)[^\n]*)")
+FIRST_KEYWORD_LINE = re.compile(rb"[ \t]*\*(?!\*)[^\n]*")
+INCLUDE = "*INCLUDE"
+SHARED_MODEL = "shared_model.inp"  # see `SharedModel`
+EIGENMODES = ".eig"  # suffix of the eigenmodes written by a *FREQUENCY step with STORAGE=YES
+COPY_CHUNK_SIZE = 1024 * 1024
+CENTRIF_FIELDS = 9  # ELSET, CENTRIF, omega^2, point on the axis (3), axis direction (3)
+
+
+class Patch:
+    """
+    An edit of a deck file: the bytes `start:end` get replaced by `text`.
+    """
+
+    __slots__ = ("path", "start", "end", "text")
+
+    def __init__(self, path: Path, start: int, end: int, text: str) -> None:
+        self.path = path
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __repr__(self) -> str:
+        return f"Patch {self.path.name}[{self.start}:{self.end}] = {self.text!r}"
+
+
+class Card:
+    """
+    A keyword card: the keyword line at byte `start` of `file` and its data lines up to `end`.
+    The keyword is upper case (e.g. "*DLOAD"), the parameter names too.
+    """
+
+    __slots__ = ("file", "keyword", "parameters", "start", "data_start", "end")
+
+    def __init__(self, file: Path, line: str, start: int, data_start: int, end: int) -> None:
+        self.file = file
+        keyword, *parameters = line.split(",")
+        self.keyword = " ".join(keyword.split()).upper()
+        self.parameters: dict[str, str] = {}
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip():
+                self.parameters[name.strip().upper()] = value.strip()
+        self.start = start
+        self.data_start = data_start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return f"Card {self.keyword} {self.parameters}"
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        with open(self.file, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def data_lines(self) -> list[tuple[int, int, str]]:
+        """
+        Byte range and text of every data line, without comments and empty lines.
+        Only meant for small cards, the data gets read from the file.
+        """
+        lines = []
+        position = self.data_start
+        for raw in self.read(self.data_start).splitlines(keepends=True):
+            line = raw.rstrip(b"\r\n")
+            if line.strip() and not line.lstrip().startswith(b"**"):
+                lines.append((position, position + len(line), line.decode("utf-8", "replace")))
+            position += len(raw)
+        return lines
+
+
+class DeckFile:
+    """
+    One file of an input deck with the index of its keyword cards. The file is scanned once with a
+    single regex over a memory map, so its (possibly millions of) node and element lines are never
+    touched in Python.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        stat = path.stat()
+        self.mtime = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.cards: list[Card] = []
+
+        if self.size == 0:
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            matches = [
+                (match.start(1), match.end(1), match.group(1))
+                for match in KEYWORD_LINE.finditer(data)
+            ]
+            first = FIRST_KEYWORD_LINE.match(data)
+            if first is not None:
+                matches.insert(0, (first.start(), first.end(), first.group()))
+        for index, (start, end, line) in enumerate(matches):
+            data_start = min(end + 1, self.size)
+            card_end = matches[index + 1][0] if index + 1 < len(matches) else self.size
+            self.cards.append(
+                Card(path, line.decode("utf-8", "replace").strip(), start, data_start, card_end)
+            )
+
+    @property
+    def is_stale(self) -> bool:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return True
+        return stat.st_mtime_ns != self.mtime or stat.st_size != self.size
+
+    def write(
+        self,
+        target: Path,
+        patches: Iterable[Patch],
+        start: int = 0,
+        end: Optional[int] = None,
+        prefix: str = "",
+    ):
+        """
+        Writes a copy of the file (or of its bytes `start:end`) with the `patches` applied, streamed in
+        chunks. `prefix` is written in front.
+        """
+        end = self.size if end is None else end
+        with open(self.path, "rb") as source, open(target, "wb") as out:
+            out.write(prefix.encode("utf-8"))
+            position = start
+            for patch in sorted(patches, key=lambda patch: patch.start):
+                _copy_range(source, out, position, patch.start)
+                out.write(patch.text.encode("utf-8"))
+                position = patch.end
+            _copy_range(source, out, position, end)
+
+
+def _copy_range(source, out, start: int, end: int):
+    source.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = source.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        out.write(chunk)
+        remaining -= len(chunk)
+
+
+class DeckStep:
+    """
+    The cards of a `*STEP` up to its `*END STEP`. The procedure is the first card, e.g. `*FREQUENCY`.
+    """
+
+    __slots__ = ("number", "cards")
+
+    def __init__(self, number: int, cards: list[Card]) -> None:
+        self.number = number
+        self.cards = cards
+
+    def __repr__(self) -> str:
+        return f"DeckStep {self.number} {self.procedure}"
+
+    @property
+    def procedure(self) -> Optional[Card]:
+        return self.cards[1] if len(self.cards) > 1 else None
+
+
+class CentrifLoad:
+    """
+    A `*DLOAD` data line of type CENTRIF, `name` is its element set.
+    """
+
+    __slots__ = ("name", "file", "start", "end", "fields")
+
+    def __init__(self, file: Path, start: int, end: int, fields: list[str]) -> None:
+        self.name = fields[0].strip()
+        self.file = file
+        self.start = start
+        self.end = end
+        self.fields = fields
+
+    def __repr__(self) -> str:
+        return f"CentrifLoad {self.name}: {','.join(self.fields)}"
+
+    def line(self, magnitude: float) -> str:
+        """
+        The data line of the load with another magnitude (the third field).
+        """
+        fields = self.fields.copy()
+        fields[2] = str(magnitude)
+        return ",".join(fields)
+
+    def patch(self, magnitude: float) -> Patch:
+        """
+        Replaces the magnitude of the load.
+        """
+        return Patch(self.file, self.start, self.end, self.line(magnitude))
+
+
+class InputDeck:
+    """
+    Keyword card index of a `.inp` file and the files it includes (`*INCLUDE, INPUT=...`, relative to
+    the directory of the deck like ccx resolves them). `cards` are in the order ccx reads them.
+    Edits are made as `Patch`es, which get applied while writing a copy of the deck (see `write`).
+    Use `load_deck` to get the index of a deck, which is only re-built once a file of it changed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.files: dict[Path, DeckFile] = {}
+        self.cards: list[Card] = []
+        self._keywords: dict[str, list[Card]] = {}
+        self._load(path)
+
+    def _load(self, path: Path):
+        file = DeckFile(path)
+        self.files[path] = file
+        for card in file.cards:
+            self.cards.append(card)
+            self._keywords.setdefault(card.keyword, []).append(card)
+            if card.keyword == INCLUDE:
+                include = self.include_path(card)
+                if include is not None and include not in self.files and include.is_file():
+                    self._load(include)
+
+    def include_path(self, card: Card) -> Optional[Path]:
+        name = card.parameters.get("INPUT", "").strip('"')
+        if not name:
+            return None
+        path = Path(name)
+        return path if path.is_absolute() else self.path.parent / path
+
+    @property
+    def is_stale(self) -> bool:
+        return any(file.is_stale for file in self.files.values())
+
+    def find(self, keyword: str) -> list[Card]:
+        """
+        All cards of a keyword, e.g. "*DLOAD".
+        """
+        return self._keywords.get(" ".join(keyword.split()).upper(), [])
+
+    @cached_property
+    def steps(self) -> list[DeckStep]:
+        steps: list[DeckStep] = []
+        cards: Optional[list[Card]] = None
+        for card in self.cards:
+            if card.keyword == "*STEP":
+                cards = []
+            if cards is not None:
+                cards.append(card)
+            if card.keyword == "*END STEP" and cards is not None:
+                steps.append(DeckStep(len(steps) + 1, cards))
+                cards = None
+        return steps
+
+    @cached_property
+    def centrif_loads(self) -> dict[str, CentrifLoad]:
+        loads: dict[str, CentrifLoad] = {}
+        for card in self.find("*DLOAD"):
+            for start, end, line in card.data_lines():
+                fields = line.split(",")
+                if len(fields) == CENTRIF_FIELDS and fields[1].strip().upper() == "CENTRIF":
+                    load = CentrifLoad(card.file, start, end, fields)
+                    loads[load.name] = load
+        return loads
+
+    @property
+    def has_complex_frequency_step(self) -> bool:
+        return any(
+            "CORIOLIS" in card.parameters for card in self.find("*COMPLEX FREQUENCY")
+        )
+
+    def _frequency_step(self) -> DeckStep:
+        for step in self.steps:
+            if step.procedure is not None and step.procedure.keyword == "*FREQUENCY":
+                return step
+        raise ValueError("No Frequency Step found in the .inp file")
+
+    def _step_lines(self, step: DeckStep, skip: tuple[str, ...] = ()) -> list[str]:
+        """
+        The lines of a step in lower case, without comments and without the cards of the `skip` keywords.
+        """
+        if step.cards[0].file != step.cards[-1].file:
+            raise ValueError(f"Step {step.number} is spread over several files")
+        lines = []
+        for card in step.cards:
+            if card.keyword in skip:
+                continue
+            end = card.data_start if card is step.cards[-1] else card.end
+            text = card.read(card.start, end).decode("utf-8", "replace")
+            lines += [
+                line.strip().lower()
+                for line in text.splitlines()
+                if line.strip() and not line.strip().startswith("**")
+            ]
+        return lines
+
+    def complex_frequency_step_patch(self) -> Optional[Patch]:
+        """
+        Appends a `*COMPLEX FREQUENCY, CORIOLIS` step to the deck as a duplicate of the first `*FREQUENCY`
+        step. `None` if the deck already has one.
+        """
+        if self.has_complex_frequency_step:
+            return None
+        lines = self._step_lines(self._frequency_step())
+        lines[1] = lines[1].replace("frequency", "complex frequency,coriolis")
+        size = self.files[self.path].size
+        return Patch(self.path, size, size, "\n" + "\n".join(lines))
+
+    def eigenmode_storage_patch(self) -> Optional[Patch]:
+        """
+        Sets STORAGE=YES on the first `*FREQUENCY` step, so ccx writes its eigenmodes to `<job>.eig`.
+        `None` if it is set already.
+        """
+        card = self._frequency_step().procedure
+        assert card is not None
+        if card.parameters.get("STORAGE", "").upper() == "YES":
+            return None
+        keyword, *parameters = card.read(card.start, card.data_start).decode("utf-8").strip().split(",")
+        parameters = [
+            parameter
+            for parameter in parameters
+            if parameter.partition("=")[0].strip().upper() != "STORAGE"
+        ]
+        text = ",".join([keyword, *parameters, " STORAGE=YES"])
+        return Patch(card.file, card.start, card.data_start, text + "\n")
+
+    def eigenmode_restart_step(self, centrif_load: CentrifLoad, magnitude: float) -> str:
+        """
+        A `*COMPLEX FREQUENCY, CORIOLIS` step that runs on its own: ccx reads the eigenmodes from the
+        `<job>.eig` of an earlier run instead of the static and the `*FREQUENCY` step computing them.
+        The speed is set by `centrif_load` with the given magnitude, other loads of the step are left out.
+        """
+        complex_steps = [
+            step
+            for step in self.steps
+            if step.procedure is not None and step.procedure.keyword == "*COMPLEX FREQUENCY"
+        ]
+        if complex_steps:
+            lines = self._step_lines(complex_steps[0], skip=("*DLOAD",))
+        else:
+            lines = self._step_lines(self._frequency_step(), skip=("*DLOAD",))
+            lines[1] = lines[1].replace("frequency", "complex frequency,coriolis")
+        lines[-1:-1] = ["*dload", centrif_load.line(magnitude)]
+        return "\n".join(lines) + "\n"
+
+    def includes(self, path: Path) -> Iterator[tuple[Card, Path]]:
+        """
+        The `*INCLUDE` cards of a deck file with the (indexed) files they include.
+        """
+        for card in self.files[path].cards:
+            include = self.include_path(card) if card.keyword == INCLUDE else None
+            if include is not None and include in self.files:
+                yield card, include
+
+    def write(self, target: Path, patches: Iterable[Patch] = ()):
+        """
+        Writes the deck with the `patches` applied to `target`. Included files are only copied (next to
+        `target`) if they have patches themselves or include other files, the `*INCLUDE` cards are pointed
+        to the copies or the original files.
+        """
+        by_file: dict[Path, list[Patch]] = {}
+        for patch in patches:
+            by_file.setdefault(patch.path, []).append(patch)
+
+        copies = self._copies(target, by_file)
+        for path, copy in copies.items():
+            file_patches = by_file.get(path, []).copy()
+            for card, include in self.includes(path):
+                include_target = (
+                    copies[include].name if include in copies else os.path.abspath(include)
+                )
+                file_patches.append(include_patch(card, include_target))
+            self.files[path].write(copy, file_patches)
+
+    def _copies(self, target: Path, by_file: dict[Path, list[Patch]]) -> dict[Path, Path]:
+        """
+        Target path of every file that needs to be copied: the deck itself, patched files, files
+        including others (their relative paths would not resolve from the new directory) and the files
+        including those.
+        """
+        parents: dict[Path, Path] = {}
+        for path in self.files:
+            for _, include in self.includes(path):
+                parents.setdefault(include, path)
+
+        copies: dict[Path, Path] = {self.path: target}
+        for path in [*by_file, *parents.values()]:
+            while path not in copies:
+                name = f"{target.stem}_{path.name}"
+                number = 1
+                while target.parent / name in copies.values():
+                    number += 1
+                    name = f"{target.stem}_{number}_{path.name}"
+                copies[path] = target.parent / name
+                path = parents[path]
+        return copies
+
+
+class SharedModel:
+    """
+    Variants of a deck that only differ in their steps, e.g. the speeds of a Campbell analysis.
+    The model definition (everything before the first `*STEP`) is written once to `directory`, the files
+    it includes get linked there. Every variant is a small file in its own subdirectory, which includes
+    the model and holds the (patched) steps. So the setup writes the deck once plus N times its steps,
+    instead of N times the whole deck.
+
+    This only works if the steps follow the model in the deck file itself and all patches are inside
+    them (see `supports`), other variants are written as complete copies of the deck.
+    """
+
+    def __init__(self, deck: InputDeck, directory: Path) -> None:
+        self.deck = deck
+        self.directory = directory
+        main = deck.files[deck.path]
+        self.step_start: Optional[int] = None
+        steps = deck.steps
+        if steps and steps[0].cards[0].file == deck.path:
+            self.step_start = steps[0].cards[0].start
+        if self.step_start is None:
+            return
+
+        # the variants are run inside a subdirectory, all paths are relative to it
+        self._links: dict[Path, str] = {}
+        for number, path in enumerate(deck.files):
+            if path != deck.path:
+                self._links[path] = f"{number}_{path.name}"
+        for path, name in self._links.items():
+            if any(deck.includes(path)):
+                deck.files[path].write(self.directory / name, self._include_patches(path))
+            else:
+                link_file(path, self.directory / name)
+        main.write(
+            self.directory / SHARED_MODEL,
+            [
+                patch
+                for patch in self._include_patches(deck.path)
+                if patch.start < self.step_start
+            ],
+            end=self.step_start,
+        )
+
+    def _include_patches(self, path: Path) -> list[Patch]:
+        return [
+            include_patch(card, f"../{self._links[include]}")
+            for card, include in self.deck.includes(path)
+        ]
+
+    def supports(self, patches: list[Patch]) -> bool:
+        return self.step_start is not None and all(
+            patch.path == self.deck.path and patch.start >= self.step_start for patch in patches
+        )
+
+    def write_variant(self, name: str, patches: Iterable[Patch] = ()) -> Path:
+        """
+        Writes the variant `name` to `<directory>/<name>/<name>.inp` and returns its path.
+        """
+        patches = list(patches)
+        job_dir = self.directory / name
+        job_dir.mkdir(parents=True, exist_ok=True)
+        path = job_dir / f"{name}.inp"
+        if not self.supports(patches):
+            self.deck.write(path, patches)
+            return path
+
+        include_patches = [
+            patch
+            for patch in self._include_patches(self.deck.path)
+            if patch.start >= self.step_start  # type: ignore
+        ]
+        self.deck.files[self.deck.path].write(
+            path,
+            patches + include_patches,
+            start=self.step_start,  # type: ignore
+            prefix=f"*INCLUDE, INPUT=../{SHARED_MODEL}\n",
+        )
+        return path
+
+    def write_restart_variant(self, name: str, step: str) -> Path:
+        """
+        Writes the variant `name` with the model and only the given step (e.g. from
+        `InputDeck.eigenmode_restart_step`) to `<directory>/<name>/<name>.inp` and returns its path.
+        """
+        if self.step_start is None:
+            raise ValueError("The steps of the deck are not in its main file")
+        job_dir = self.directory / name
+        job_dir.mkdir(parents=True, exist_ok=True)
+        path = job_dir / f"{name}.inp"
+        path.write_text(f"*INCLUDE, INPUT=../{SHARED_MODEL}\n{step}")
+        return path
+
+
+def include_patch(card: Card, include: str) -> Patch:
+    """
+    Points an `*INCLUDE` card to another file.
+    """
+    return Patch(card.file, card.start, card.data_start, f"*INCLUDE, INPUT={include}\n")
+
+
+def link_file(source: Path, target: Path):
+    """
+    Hardlinks a file, or symlinks it, or copies it if the file system supports neither.
+    """
+    try:
+        os.link(source, target)
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(source), target)
+        except OSError:
+            shutil.copyfile(source, target)
+
+
+_decks: dict[Path, InputDeck] = {}
+
+
+def load_deck(path: Path) -> InputDeck:
+    """
+    The card index of a deck. It is built once and re-used until a file of the deck changes
+    (by modification time and size).
+    """
+    path = Path(os.path.abspath(path))
+    deck = _decks.get(path)
+    if deck is None or deck.is_stale:
+        deck = _decks[path] = InputDeck(path)
+    return deck
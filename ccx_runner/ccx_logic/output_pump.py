@@ -0,0 +1,97 @@
+import codecs
+import os
+import selectors
+import sys
+import threading
+from typing import IO, Callable, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+LinesCallback = Callable[[list[str]], None]
+
+
+class LineSplitter:
+    """
+    Splits the raw chunks of a stream into decoded lines. Incomplete lines (and characters) are kept
+    until the rest of them arrives. Line endings are normalized to `"\\n"`, like in text mode.
+    """
+
+    def __init__(self, encoding: str = "utf-8") -> None:
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._rest = ""
+
+    def feed(self, chunk: bytes) -> list[str]:
+        """
+        Returns the lines completed by `chunk`.
+        """
+        text = (self._rest + self._decoder.decode(chunk)).replace("\r\n", "\n")
+        *lines, self._rest = text.split("\n")
+        return [line + "\n" for line in lines]
+
+    def flush(self) -> list[str]:
+        """
+        Returns the last line, if the stream did not end with a line break.
+        """
+        text = self._rest + self._decoder.decode(b"", final=True)
+        self._rest = ""
+        return [text] if text else []
+
+
+def pump_output(
+    streams: list[tuple[Optional[IO[bytes]], LinesCallback]],
+):
+    """
+    Reads all given (binary) pipes at the same time until they are closed, so no pipe can fill up and
+    block the process writing to it. The pipes are read in large chunks, every callback receives
+    batches of complete lines. The callbacks are never called concurrently.
+
+    On Windows, where `selectors` does not support pipes, every pipe gets a reader thread.
+    """
+    streams = [(stream, callback) for stream, callback in streams if stream is not None]
+    if sys.platform == "win32":
+        _pump_threaded(streams)  # type: ignore
+    else:
+        _pump_selector(streams)  # type: ignore
+
+
+def _pump_selector(streams: list[tuple[IO[bytes], LinesCallback]]):
+    with selectors.DefaultSelector() as selector:
+        for stream, callback in streams:
+            selector.register(stream, selectors.EVENT_READ, (LineSplitter(), callback))
+
+        while selector.get_map():
+            for key, _ in selector.select():
+                splitter, callback = key.data
+                chunk = os.read(key.fd, CHUNK_SIZE)
+                if chunk:
+                    lines = splitter.feed(chunk)
+                else:  # end of file
+                    selector.unregister(key.fileobj)
+                    lines = splitter.flush()
+                if lines:
+                    callback(lines)
+
+
+def _pump_threaded(streams: list[tuple[IO[bytes], LinesCallback]]):
+    callback_lock = threading.Lock()
+
+    def pump(stream: IO[bytes], callback: LinesCallback):
+        splitter = LineSplitter()
+        while chunk := stream.read1(CHUNK_SIZE):  # type: ignore
+            lines = splitter.feed(chunk)
+            if lines:
+                with callback_lock:
+                    callback(lines)
+        lines = splitter.flush()
+        if lines:
+            with callback_lock:
+                callback(lines)
+
+    threads = [
+        threading.Thread(target=pump, args=stream_and_callback, daemon=True)
+        for stream_and_callback in streams
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,35 @@
+from enum import StrEnum, auto
+from typing import Any, Callable
+
+
+class ProgressType(StrEnum):
+    STEP = auto()
+    INCREMENT = auto()
+    TIME = auto()
+    ITERATION = auto()
+    RESIDUAL = auto()
+    ENERGY = auto()
+
+
+class ProgressEvent:
+    """
+    Solver progress found by the parser, e.g. a new increment or a residual of the current iteration.
+    `data` only holds JSON serializable values.
+    """
+
+    __slots__ = ("type", "step", "data")
+
+    def __init__(self, type: ProgressType, step: str, **data: Any) -> None:
+        self.type = type
+        self.step = step
+        self.data = data
+
+    def __repr__(self) -> str:
+        return f"ProgressEvent {self.type} {self.step} {self.data}"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"event": str(self.type), "step": self.step, **self.data}
+
+
+ProgressListener = Callable[[ProgressEvent], Any]
+
@@ -1,76 +1,396 @@
 import numpy as np
 import itertools
+import mmap
 from functools import cached_property
+from pathlib import Path
+
+# Fixed column widths of a long format ASCII nodal record: " -1", I10 node, E12.5 values
+RECORD_KEY_WIDTH = 3
+NODE_WIDTH = 10
+SHORT_NODE_WIDTH = 5
+VALUE_WIDTH = 12
+
+# Format flag of the "100CL" header line
+SHORT_FORMAT = 0
+LONG_FORMAT = 1
+BINARY_FORMAT = 2
+# Columns of the format flag inside the fixed width "100CL" line
+FORMAT_COLUMNS = slice(73, 75)
+# Records converted at once, keeps the temporaries of the vectorized parser in the CPU cache
+CHUNK_RECORDS = 8192
 
 
 class ResultBlock:
-    def __init__(self, frd: list[str], beginn: int) -> None:
+    """
+    A single result block of a `.frd` file. `frd` is any bytes-like buffer holding the file (usually a
+    memory map, see `FrdFile`) and `beginn` the byte offset of the block's `1PSTEP` line.
+    Only the header and component lines are parsed on creation, the data is decoded on access.
+    """
+
+    def __init__(self, frd: bytes | mmap.mmap, beginn: int) -> None:
         self.frd = frd
         self.beginn = beginn
         self.header: dict[str, list[str]] = {}  # header: args
         self.output_type = ""
         self.components: list[str] = []
+        self.format = LONG_FORMAT
+        self.number_of_values = 0  # values per node record, without predefined components like "ALL"
 
         curline = beginn
         # Parse Header section
-        while not frd[curline].strip().startswith("-4"):
-            line = frd[curline]
+        line, nextline = _read_line(frd, curline)
+        while not line.strip().startswith("-4"):
             contents = line.split()
             self.header[contents[0]] = contents[1:]
-            curline += 1
+            if contents[0] == "100CL" and line[FORMAT_COLUMNS].strip().isdigit():
+                self.format = int(line[FORMAT_COLUMNS])
+            curline = nextline
+            line, nextline = _read_line(frd, curline)
 
         # Parse Components
-        while not frd[curline].strip().startswith("-1"):
-            line = frd[curline].strip()
+        while True:
+            line = line.strip()
             if line.startswith("-4"):
                 self.output_type = line.split()[1]
-            if line.startswith("-5"):
-                self.components.append(line.split()[1])
-            curline += 1
+            elif line.startswith("-5"):
+                contents = line.split()
+                self.components.append(contents[1])
+                if len(contents) < 7 or not contents[6].startswith("1"):
+                    self.number_of_values += 1
+            elif line.startswith(("-1", "-3")):
+                break
+            curline = nextline
+            if self.is_binary and frd[curline : curline + 3] not in (b" -4", b" -5", b" -3"):
+                break  # binary records follow directly after the last component line
+            line, nextline = _read_line(frd, curline)
 
         self.data_begin = curline
+        if self.is_binary:
+            self.data_end = self._find_data_end(self.binary_dtype.itemsize)
+        else:
+            self.data_end = self._find_data_end(nextline - curline)
 
     def __repr__(self) -> str:
         return "|".join(tuple(self.header.keys()))
 
+    @property
+    def number_of_nodes(self) -> int | None:
+        try:
+            return int(self.header["100CL"][2])
+        except (KeyError, IndexError, ValueError):
+            return None
+
+    @property
+    def is_binary(self) -> bool:
+        return self.format == BINARY_FORMAT
+
+    @property
+    def binary_dtype(self) -> np.dtype:
+        """
+        Layout of a binary node record: the node number as int32, followed by the values as float32.
+        """
+        return np.dtype([("node", "<i4"), ("values", "<f4", (self.number_of_values,))])
+
+    def _find_data_end(self, record_length: int) -> int:
+        """
+        Returns the byte offset of the ` -3` line that terminates the data records. The node count of the
+        header allows skipping the whole block, the end marker is only searched if that does not add up.
+        """
+        if self.number_of_nodes is not None:
+            data_end = self.data_begin + self.number_of_nodes * record_length
+            if self.is_binary or self.frd[data_end : data_end + 3] == b" -3":
+                return data_end
+        data_end = self.frd.find(b"\n -3", self.data_begin)
+        return data_end + 1 if data_end >= 0 else len(self.frd)
+
     @cached_property
     def data(self):
         """
         Extracts all the data as one large Numpy Array.
         """
-        frd = self.frd
-        curline = self.data_begin
-        all_lines = []
-        while frd[curline].strip().startswith("-1"):
-            line = frd[curline].strip()
-            components_str = line.removeprefix("-1")
-            node = int(components_str[:10])
-            fields = [
-                float("".join(batch))
-                for batch in itertools.batched(components_str[10:], 12)
-            ]
-            all_lines.append([node] + fields)
-
-            curline += 1
-        return np.array(all_lines)
+        return self._decode()
+
+    def subset_data(self, node_ids: np.ndarray) -> np.ndarray:
+        """
+        Like `data`, but only the records of the given nodes are decoded (in the order of the file).
+        Nothing is cached, so the memory only grows with the size of the subset.
+        """
+        return self._decode(np.asarray(node_ids).astype(np.int64))
+
+    def node_ids(self) -> np.ndarray:
+        """
+        Decodes only the node numbers of the block.
+        """
+        if self.data_end <= self.data_begin:
+            return np.array([], dtype=np.int64)
+        if self.is_binary:
+            return self.binary_records()["node"].astype(np.int64)
+        records = fixed_width_records(self._data_view())
+        if records is None:
+            text = self.frd[self.data_begin : self.data_end].decode("latin-1")
+            return parse_node_id_lines(text.splitlines(), self.node_width)
+        return record_node_ids(records, self.node_width)
+
+    @property
+    def node_width(self) -> int:
+        return SHORT_NODE_WIDTH if self.format == SHORT_FORMAT else NODE_WIDTH
+
+    def _data_view(self) -> np.ndarray:
+        return np.frombuffer(
+            self.frd, dtype=np.uint8, count=self.data_end - self.data_begin, offset=self.data_begin
+        )
+
+    def _decode(self, node_ids: np.ndarray | None = None) -> np.ndarray:
+        if self.data_end <= self.data_begin:
+            return np.array([])
+
+        if self.is_binary:
+            records = self.binary_records()
+            if node_ids is not None:
+                records = records[np.isin(records["node"], node_ids)]
+            data = np.empty((len(records), self.number_of_values + 1))
+            data[:, 0] = records["node"]
+            data[:, 1:] = records["values"]
+            return data
+
+        data = parse_nodal_records(self._data_view(), self.node_width, node_ids)
+        if data is None:
+            # Not a contiguous fixed width block, fall back to line by line parsing
+            text = self.frd[self.data_begin : self.data_end].decode("latin-1")
+            data = parse_nodal_lines(text.splitlines(), self.node_width)
+            if node_ids is not None:
+                data = data[np.isin(data[:, 0], node_ids)]
+        return data
+
+    def binary_records(self) -> np.ndarray:
+        """
+        Structured array (`node`, `values`) of a binary block. This is a zero-copy view into the
+        result file, so it must not outlive the `FrdFile` it was taken from.
+        """
+        if not self.is_binary:
+            raise ValueError("Only binary result blocks can be viewed as records.")
+        return np.frombuffer(
+            self.frd, dtype=self.binary_dtype, count=self.number_of_nodes or 0, offset=self.data_begin
+        )
 
     @staticmethod
-    def from_frd(frd: str) -> list["ResultBlock"]:
+    def index(frd: bytes | mmap.mmap) -> list["ResultBlock"]:
+        """
+        Finds all result blocks in a single pass. The data records of every block are skipped, not scanned.
+        """
         results: list[ResultBlock] = []
-        lines = frd.splitlines()
-        for nr, line in enumerate(lines):
-            if "1PSTEP" in line:
-                # new results block begins
-                results.append(ResultBlock(lines, nr))
+        position = frd.find(b"1PSTEP")
+        while position >= 0:
+            # new results block begins
+            block = ResultBlock(frd, frd.rfind(b"\n", 0, position) + 1)
+            results.append(block)
+            position = frd.find(b"1PSTEP", block.data_end)
 
         return results
 
+    @staticmethod
+    def from_frd(frd: str) -> list["ResultBlock"]:
+        return ResultBlock.index(frd.encode("latin-1"))
+
+
+class FrdFile:
+    """
+    Memory maps a `.frd` result file and indexes its result blocks. Peak memory is bounded by the
+    largest block that gets decoded, not by the size of the file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self.buffer: bytes | mmap.mmap = b""  # empty files can not be memory mapped
+        if self.path.stat().st_size > 0:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.blocks = ResultBlock.index(self.buffer)
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> "FrdFile":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _read_line(buffer: bytes | mmap.mmap, start: int) -> tuple[str, int]:
+    """
+    Returns the line beginning at the byte offset `start` and the offset of the following line.
+    """
+    if start >= len(buffer):
+        raise ValueError("Unexpected end of the result file inside a block header")
+    end = buffer.find(b"\n", start)
+    if end < 0:
+        end = len(buffer)
+    return buffer[start:end].decode("latin-1"), end + 1
+
+
+def fixed_width_records(buffer) -> np.ndarray | None:
+    """
+    Views a contiguous block of fixed width ` -1` records as a 2D character array `(n_records, record_length)`.
+    `buffer` may be any bytes-like object, views into a memory map are not copied.
+    Returns `None` if the records do not share a common length.
+    """
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    line_ends = np.flatnonzero(raw[:4096] == ord("\n"))
+    if len(line_ends) == 0:
+        return None
+    record_length = int(line_ends[0]) + 1
+    if len(raw) % record_length != 0:
+        return None
+
+    records = raw.reshape(-1, record_length)
+    if not np.all(records[:, -1] == ord("\n")):
+        return None
+    if not np.all(records[:, 1:RECORD_KEY_WIDTH] == np.frombuffer(b"-1", np.uint8)):
+        return None
+    return records
+
+
+def record_node_ids(records: np.ndarray, node_width: int = NODE_WIDTH) -> np.ndarray:
+    """
+    Decodes only the node column of fixed width records (see `fixed_width_records`).
+    """
+    node_ids = np.empty(len(records), dtype=np.int64)
+    for start in range(0, len(records), CHUNK_RECORDS):
+        chunk = records[start : start + CHUNK_RECORDS]
+        node_ids[start : start + CHUNK_RECORDS] = _parse_integer_columns(
+            chunk[:, RECORD_KEY_WIDTH : RECORD_KEY_WIDTH + node_width]
+        )
+    return node_ids
+
+
+def parse_nodal_records(
+    buffer, node_width: int = NODE_WIDTH, node_ids: np.ndarray | None = None
+) -> np.ndarray | None:
+    """
+    Parses a contiguous block of fixed width ` -1` records in one pass by viewing the raw bytes
+    as a 2D character array and converting whole columns at once. Returns the same `(node, comp...)`
+    array as `parse_nodal_lines`. If `node_ids` are given, only the values of those nodes are decoded.
+    Returns `None` if the records do not share a common length.
+    """
+    records = fixed_width_records(buffer)
+    if records is None:
+        return None
+    eol = 2 if records[0, -2] == ord("\r") else 1
+    value_start = RECORD_KEY_WIDTH + node_width
+    n_fields = (records.shape[1] - eol - value_start) // VALUE_WIDTH
+    value_end = value_start + n_fields * VALUE_WIDTH
+
+    if node_ids is not None:
+        records = records[np.isin(record_node_ids(records, node_width), node_ids)]
+
+    data = np.empty((len(records), n_fields + 1))
+    for start in range(0, len(records), CHUNK_RECORDS):
+        chunk = records[start : start + CHUNK_RECORDS]
+        data[start : start + CHUNK_RECORDS, 0] = _parse_integer_columns(
+            chunk[:, RECORD_KEY_WIDTH:value_start]
+        )
+        data[start : start + CHUNK_RECORDS, 1:] = _parse_e_columns(
+            chunk[:, value_start:value_end].reshape(len(chunk), n_fields, VALUE_WIDTH)
+        )
+    return data
+
+
+# Exactly representable powers of ten (up to 1e22), used to scale the integer mantissas without
+# rounding errors: positive exponents multiply, negative exponents divide
+_EXPONENT_OFFSET = 22
+_SCALE_MUL = np.array([float(10 ** max(k, 0)) for k in range(-22, 23)])
+_SCALE_DIV = np.array([float(10 ** max(-k, 0)) for k in range(-22, 23)])
+
+# Digit weights of an `E12.5` field (` d.dddddE+dd`): column 0 -> mantissa, column 1 -> exponent
+_E_FIELD_WEIGHTS = np.zeros((VALUE_WIDTH, 2), dtype=np.float32)
+_E_FIELD_WEIGHTS[[1, 3, 4, 5, 6, 7], 0] = [1e5, 1e4, 1e3, 1e2, 1e1, 1e0]
+_E_FIELD_WEIGHTS[[10, 11], 1] = [1e1, 1e0]
+
+# Lookup table from a sign character to its factor
+_SIGNS = np.ones(256)
+_SIGNS[ord("-")] = -1.0
+
+
+def _parse_integer_columns(chars: np.ndarray) -> np.ndarray:
+    """
+    Converts right aligned, space padded, unsigned integer fields (one per row) into floats.
+    """
+    digits = chars.astype(np.float64) - ord("0")
+    np.maximum(digits, 0, out=digits)  # padding spaces
+    return digits @ (10.0 ** np.arange(chars.shape[1] - 1, -1, -1))
+
+
+def _parse_e_columns(fields: np.ndarray) -> np.ndarray:
+    """
+    Converts `E12.5` formatted fields (`-d.dddddE+dd`), given as a `(..., 12)` character array, into floats.
+    Integer mantissa and exponent are assembled with one small matrix product (exact, all partial sums are
+    integers below 2**24) and scaled by an exact power of ten, which yields the correctly rounded value,
+    just like `float()`. Fields that do not follow this layout or whose exponent is out of the exact range
+    are left to numpy's string conversion.
+    """
+    layout_ok = (
+        np.all(fields[..., 2] == ord("."))
+        and np.all(fields[..., 8] == ord("E"))
+        and np.all((fields[..., 0] == ord(" ")) | (fields[..., 0] == ord("-")))
+        and np.all((fields[..., 9] == ord("+")) | (fields[..., 9] == ord("-")))
+    )
+    if not layout_ok:
+        return fields.copy().view(f"S{VALUE_WIDTH}")[..., 0].astype(np.float64)
+
+    # The character codes are weighted directly, the "0" offset is removed afterwards
+    mantissa_exponent = (
+        fields.reshape(-1, VALUE_WIDTH).astype(np.float32) @ _E_FIELD_WEIGHTS
+        - ord("0") * _E_FIELD_WEIGHTS.sum(axis=0)
+    ).reshape(*fields.shape[:-1], 2)
+    exponent = mantissa_exponent[..., 1].astype(np.intp)
+    exponent *= _SIGNS[fields[..., 9]].astype(np.intp)
+    exponent += _EXPONENT_OFFSET - 5
+
+    values = mantissa_exponent[..., 0].astype(np.float64)
+    exact = (exponent >= 0) & (exponent < len(_SCALE_MUL))
+    np.clip(exponent, 0, len(_SCALE_MUL) - 1, out=exponent)
+    values *= _SCALE_MUL[exponent]
+    values /= _SCALE_DIV[exponent]
+    values *= _SIGNS[fields[..., 0]]
+
+    if not np.all(exact):
+        inexact = ~exact
+        values[inexact] = (
+            fields[inexact].copy().view(f"S{VALUE_WIDTH}")[:, 0].astype(np.float64)
+        )
+    return values
+
 
-# TESTCODE
-if __name__ == "__main__":
-    with open("/home/qhuss/Downloads/simstep_0.0_0.frd", "r") as file1:
-        frd_1 = file1.read()
+def parse_nodal_lines(lines: list[str], node_width: int = NODE_WIDTH) -> np.ndarray:
+    """
+    Line by line parser for ` -1` records, used if the block is not strictly fixed width.
+    """
+    all_lines = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith("-1"):
+            break
+        components_str = line.removeprefix("-1")
+        node = int(components_str[:node_width])
+        fields = [
+            float("".join(batch))
+            for batch in itertools.batched(components_str[node_width:], VALUE_WIDTH)
+        ]
+        all_lines.append([node] + fields)
+    return np.array(all_lines)
 
-    with open("/home/qhuss/Downloads/simstep_785.3985_1.frd", "r") as file2:
-        frd_2 = file2.read()
 
+def parse_node_id_lines(lines: list[str], node_width: int = NODE_WIDTH) -> np.ndarray:
+    """
+    Like `parse_nodal_lines`, but only the node numbers are parsed.
+    """
+    node_ids = []
+    for line in lines:
+        line = line.strip()
+        if not line.startswith("-1"):
+            break
+        node_ids.append(int(line.removeprefix("-1")[:node_width]))
+    return np.array(node_ids, dtype=np.int64)
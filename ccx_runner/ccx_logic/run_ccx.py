@@ -1,4 +1,4 @@
-import dearpygui.dearpygui as dpg
+import os
 import subprocess
 import time
 from pathlib import Path
@@ -6,10 +6,23 @@ from typing import Callable, Optional
 
 from typing import TYPE_CHECKING
 
+from ccx_runner.ccx_logic.output_pump import pump_output
+
 if TYPE_CHECKING:
     from ccx_runner.ccx_logic.status import CalculixStatus
 
 
+def ccx_arguments(
+    ccx_path: Path, job_name: str, output_format: Optional[str] = None
+) -> list[str]:
+    """
+    Command line to run a job. `output_format` is passed to ccx as `-o` option.
+    """
+    if output_format:
+        return [f"{ccx_path.resolve()}", "-i", f"{job_name}", "-o", output_format]
+    return [f"{ccx_path.resolve()}", f"{job_name}"]
+
+
 def run_ccx(
     ccx_path: Path,
     job_dir: Path,
@@ -19,41 +32,49 @@ def run_ccx(
     parser: Optional[Callable] = None,
     finished: Optional[Callable] = None,
     identifier: Optional[str] = None,
-):
+    output_format: Optional[str] = None,
+    env: Optional[dict[str, str]] = None,
+    console_out_lines: Optional[Callable] = None,
+    parser_lines: Optional[Callable] = None,
+) -> int:
     """
     Runs the calculix subprocess and monitors its outputs. `parser` and `console_out` are functions that take in a single line of text, aswell as an identifier string.
-    The `finished` function will get called at the end.
+    `parser_lines` and `console_out_lines` take a list of lines instead and get called once per chunk read from ccx.
+    The `finished` function will get called at the end. Returns the exit code of ccx.
+    `output_format` is passed to ccx as `-o` option, e.g. `"bin"` for binary `.frd` results.
+    `env` holds additional environment variables for ccx, e.g. `OMP_NUM_THREADS`.
     """
-
     process = subprocess.Popen(
-        [f"{ccx_path.resolve()}", f"{job_name}"],
+        ccx_arguments(ccx_path, job_name, output_format),
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,
         cwd=job_dir.resolve(),
+        env={**os.environ, **env} if env else None,
     )
     if process_holder:
         process_holder.process = process # type: ignore
-    try:
-        while process.poll() is None:
-            if process.stdout:
-                for line in process.stdout:
-                    if console_out:
-                        console_out(line, identifier)
-                    if parser:
-                        parser(line, identifier)
-
-            if process.stderr:
-                for line in process.stderr:
-                    if console_out:
-                        console_out(line, identifier)
-    except AttributeError:
-        pass
-
-    return_code = process.returncode if process else 0
-    if return_code != 0:
+
+    def show(lines: list[str]):
+        if console_out_lines:
+            console_out_lines(lines, identifier)
         if console_out:
-            console_out(f"ccx exited with error code: {return_code}", identifier)
+            for line in lines:
+                console_out(line, identifier)
+
+    def stdout_lines(lines: list[str]):
+        show(lines)
+        if parser_lines:
+            parser_lines(lines, identifier)
+        if parser:
+            for line in lines:
+                parser(line, identifier)
+
+    # stdout and stderr are read at the same time, so neither of the pipes can fill up and block ccx
+    pump_output([(process.stdout, stdout_lines), (process.stderr, show)])
+
+    return_code = process.wait()
+    if return_code != 0:
+        show([f"ccx exited with error code: {return_code}"])
     if finished:
         finished(identifier)
+    return return_code
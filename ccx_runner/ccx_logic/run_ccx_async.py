@@ -0,0 +1,333 @@
+import asyncio
+import contextlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from enum import StrEnum, auto
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Coroutine, Iterable, Optional
+
+from ccx_runner.ccx_logic.output_pump import CHUNK_SIZE, LineSplitter
+from ccx_runner.ccx_logic.run_ccx import ccx_arguments
+
+TERMINATE_TIMEOUT = 5.0  # [s] until a terminated ccx process gets killed
+RSS_POLL_INTERVAL = 0.5  # [s]
+
+
+class EventType(StrEnum):
+    STARTED = auto()
+    STDOUT = auto()
+    STDERR = auto()
+    FINISHED = auto()
+
+
+class CcxResult:
+    """
+    Outcome of a ccx run. `peak_rss` is the sampled peak resident memory in bytes (Linux only, else `None`).
+    """
+
+    def __init__(
+        self,
+        identifier: Optional[str],
+        return_code: Optional[int],
+        wall_time: float,
+        peak_rss: Optional[int],
+        log_path: Optional[Path],
+        timed_out: bool = False,
+        cancelled: bool = False,
+    ) -> None:
+        self.identifier = identifier
+        self.return_code = return_code
+        self.wall_time = wall_time
+        self.peak_rss = peak_rss
+        self.log_path = log_path
+        self.timed_out = timed_out
+        self.cancelled = cancelled
+
+    def __repr__(self) -> str:
+        return (
+            f"CcxResult {self.identifier}: return code {self.return_code},"
+            f" {self.wall_time:.2f}s, peak RSS {self.peak_rss}"
+        )
+
+    @property
+    def success(self) -> bool:
+        return self.return_code == 0 and not (self.timed_out or self.cancelled)
+
+
+class CcxEvent:
+    """
+    Something that happened during a ccx run: it started, wrote `lines` to stdout or stderr,
+    or finished with `result`.
+    """
+
+    def __init__(
+        self,
+        type: EventType,
+        identifier: Optional[str],
+        lines: Optional[list[str]] = None,
+        result: Optional[CcxResult] = None,
+    ) -> None:
+        self.type = type
+        self.identifier = identifier
+        self.lines = lines or []
+        self.result = result
+
+    def __repr__(self) -> str:
+        return f"CcxEvent {self.type} {self.identifier}"
+
+
+def read_peak_rss(pid: int) -> Optional[int]:
+    """
+    Peak resident set size of a running process in bytes, `None` if it is not available.
+    """
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+async def terminate(process: asyncio.subprocess.Process):
+    """
+    Terminates a process and kills it, if it does not exit within `TERMINATE_TIMEOUT`.
+    """
+    try:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+        except TimeoutError:
+            process.kill()
+            await process.wait()
+    except ProcessLookupError:
+        pass  # already gone
+
+
+async def run_ccx_async(
+    ccx_path: Path,
+    job_dir: Path,
+    job_name: str,
+    identifier: Optional[str] = None,
+    output_format: Optional[str] = None,
+    env: Optional[dict[str, str]] = None,
+    cpus: Optional[list[int]] = None,
+    timeout: Optional[float] = None,
+    log_path: Optional[Path] = None,
+    write_log: bool = True,
+    events: Optional[asyncio.Queue[CcxEvent]] = None,
+    console_out_lines: Optional[Callable] = None,
+    parser_lines: Optional[Callable] = None,
+    process_holder: Optional[object] = None,
+) -> CcxResult:
+    """
+    Runs ccx as asyncio subprocess, so any number of jobs can be supervised by one event loop.
+    The arguments match `run_ccx`. Additionally, the job can be pinned to `cpus` and gets terminated after
+    `timeout` seconds. All output is written to `log_path` (default: `<job_dir>/<job_name>.log`, unless
+    `write_log` is off) and put into the `events` queue, if given. Cancelling the task terminates ccx.
+    The `identifier` defaults to the job name.
+    """
+    identifier = identifier or job_name
+    log_path = (log_path or job_dir / f"{job_name}.log") if write_log else None
+
+    def emit(event: CcxEvent):
+        if events is not None:
+            events.put_nowait(event)
+
+    start_time = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        *ccx_arguments(ccx_path, job_name, output_format),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=job_dir.resolve(),
+        env={**os.environ, **env} if env else None,
+    )
+    if process_holder:
+        process_holder.process = process  # type: ignore
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(process.pid, cpus)
+        except OSError:
+            pass
+    emit(CcxEvent(EventType.STARTED, identifier))
+
+    def show(lines: list[str]):
+        if console_out_lines:
+            console_out_lines(lines, identifier)
+
+    async def pump(stream: asyncio.StreamReader, event_type: EventType, log):
+        splitter = LineSplitter()
+        while chunk := await stream.read(CHUNK_SIZE):
+            lines = splitter.feed(chunk)
+            if lines:
+                handle(lines, event_type, log)
+        lines = splitter.flush()
+        if lines:
+            handle(lines, event_type, log)
+
+    def handle(lines: list[str], event_type: EventType, log):
+        if log is not None:
+            log.writelines(lines)
+        show(lines)
+        if parser_lines and event_type == EventType.STDOUT:
+            parser_lines(lines, identifier)
+        emit(CcxEvent(event_type, identifier, lines))
+
+    peak_rss: Optional[int] = None
+
+    async def watch_memory():
+        nonlocal peak_rss
+        while True:
+            peak_rss = read_peak_rss(process.pid) or peak_rss
+            await asyncio.sleep(RSS_POLL_INTERVAL)
+
+    timed_out = cancelled = False
+    log_file = open(log_path, "w", encoding="utf-8") if log_path else None
+    with log_file or contextlib.nullcontext() as log:
+        memory_watcher = asyncio.create_task(watch_memory())
+        try:
+            async with asyncio.timeout(timeout):
+                await asyncio.gather(
+                    pump(process.stdout, EventType.STDOUT, log),  # type: ignore
+                    pump(process.stderr, EventType.STDERR, log),  # type: ignore
+                )
+                await process.wait()
+        except TimeoutError:
+            timed_out = True
+        except asyncio.CancelledError:
+            cancelled = True
+        finally:
+            memory_watcher.cancel()
+            if process.returncode is None:
+                await terminate(process)
+
+        return_code = process.returncode
+        if timed_out:
+            show([f"ccx timed out after {timeout}s"])
+        elif return_code != 0 and not cancelled:
+            show([f"ccx exited with error code: {return_code}"])
+
+    result = CcxResult(
+        identifier,
+        return_code,
+        time.perf_counter() - start_time,
+        peak_rss,
+        log_path,
+        timed_out,
+        cancelled,
+    )
+    emit(CcxEvent(EventType.FINISHED, identifier, result=result))
+    if cancelled:
+        raise asyncio.CancelledError
+    return result
+
+
+async def ccx_events(
+    jobs: Iterable[dict[str, Any]], max_concurrent: Optional[int] = None
+) -> AsyncIterator[CcxEvent]:
+    """
+    Runs all `jobs` (keyword arguments of `run_ccx_async`), at most `max_concurrent` at a time,
+    and yields the events of all of them as they happen:
+
+        async for event in ccx_events(jobs, max_concurrent=8):
+            ...
+
+    Leaving the loop early terminates the jobs that are still running, once the generator is closed
+    (e.g. through `contextlib.aclosing`).
+    """
+    events: asyncio.Queue[CcxEvent] = asyncio.Queue()
+    semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+
+    async def run(job: dict[str, Any]):
+        try:
+            if semaphore is None:
+                await run_ccx_async(**job, events=events)
+            else:
+                async with semaphore:
+                    await run_ccx_async(**job, events=events)
+        except OSError as error:  # ccx could not be started
+            events.put_nowait(
+                CcxEvent(EventType.FINISHED, job.get("identifier"), [str(error)])
+            )
+
+    tasks = [asyncio.create_task(run(job)) for job in jobs]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            event = await events.get()
+            if event.type == EventType.FINISHED:
+                remaining -= 1
+            yield event
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running in its own thread, so synchronous code (like the GUI) can run
+    coroutines such as `run_ccx_async` on it.
+    """
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._tasks: dict[Future, asyncio.Task] = {}  # only used inside the loop
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Schedules a coroutine on the loop and returns a future of its result. Its done callbacks run in
+        the loop thread.
+        """
+        future: Future = Future()
+        self.call(self._start, coroutine, future)
+        return future
+
+    def cancel(self, future: Future):
+        """
+        Cancels a coroutine started with `submit`. Unlike `future.cancel()`, which completes the future
+        right away, the future is only done once the coroutine has handled the cancellation (e.g. once
+        ccx has terminated).
+        """
+        self.call(self._cancel, future)
+
+    def call(self, function: Callable, *args):
+        """
+        Calls a function inside the loop thread.
+        """
+        self.loop.call_soon_threadsafe(function, *args)
+
+    # Everything below runs inside the loop
+
+    def _start(self, coroutine: Coroutine, future: Future):
+        if future.cancelled():
+            coroutine.close()
+            return
+        task = self.loop.create_task(coroutine)
+        self._tasks[future] = task
+        task.add_done_callback(lambda task: self._finish(future, task))
+        # future.cancel() from another thread still cancels the coroutine
+        future.add_done_callback(
+            lambda future: future.cancelled() and self.call(self._cancel, future)
+        )
+
+    def _cancel(self, future: Future):
+        task = self._tasks.get(future)
+        if task is not None:
+            task.cancel()
+
+    def _finish(self, future: Future, task: asyncio.Task):
+        del self._tasks[future]
+        if future.cancelled():
+            return  # already completed by future.cancel()
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
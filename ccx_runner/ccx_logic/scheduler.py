@@ -0,0 +1,357 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from enum import StrEnum, auto
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from ccx_runner.ccx_logic.run_ccx_async import BackgroundLoop, CcxResult, run_ccx_async
+
+
+class JobState(StrEnum):
+    QUEUED = auto()
+    RUNNING = auto()
+    DONE = auto()
+    FAILED = auto()
+    CANCELLED = auto()
+
+
+def available_cpus() -> list[int]:
+    """
+    The CPUs this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def autotune_candidates(max_concurrency: int) -> list[int]:
+    """
+    Numbers of concurrent jobs tried by the autotune mode: the powers of two below `max_concurrency`
+    and `max_concurrency` itself.
+    """
+    candidates = [1]
+    while candidates[-1] * 2 < max_concurrency:
+        candidates.append(candidates[-1] * 2)
+    if candidates[-1] != max_concurrency:
+        candidates.append(max_concurrency)
+    return candidates
+
+
+class Job:
+    """
+    A single ccx run managed by the `JobScheduler`. `run_arguments` are passed on to `run_ccx_async`.
+    """
+
+    def __init__(self, identifier: str, run_arguments: dict[str, Any]) -> None:
+        self.identifier = identifier
+        self.run_arguments = run_arguments
+        self.state = JobState.QUEUED
+        self.attempts = 0
+        self.return_code: Optional[int] = None
+        self.result: Optional[CcxResult] = None
+        self.process = None  # set by run_ccx_async, which uses the job as its process holder
+        self.task: Optional[asyncio.Task] = None
+        self.start_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self.threads: Optional[int] = None
+        self.cpus: Optional[list[int]] = None
+
+    def __repr__(self) -> str:
+        return f"Job {self.identifier} [{self.state}]"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in (JobState.DONE, JobState.FAILED, JobState.CANCELLED)
+
+    @property
+    def wall_time(self) -> Optional[float]:
+        if self.start_time is None:
+            return None
+        return (self.end_time or time.time()) - self.start_time
+
+
+class JobScheduler:
+    """
+    Runs ccx jobs from a queue on a fixed number of workers. The workers are tasks on an asyncio loop in
+    a background thread, so the scheduler needs a single thread, no matter how many jobs run at once.
+    Its methods can be called from any thread.
+    Failed jobs are retried up to `max_retries` times, cancelled jobs get their process terminated.
+    `job_finished` is called with every job that reached a final state, `all_finished` once no job is
+    queued or running anymore.
+
+    The `cores` (default: all available) are split between the concurrent jobs, every job gets
+    `cores // concurrency` threads through `OMP_NUM_THREADS` and `CCX_NPROC_EQUATION_SOLVER`.
+    With `pin_cpus`, every job is bound to its own share of the CPUs (Linux only).
+    `timeout` is the maximum run time of a job in seconds.
+    With `autotune`, the first jobs are run with an increasing number of concurrent jobs
+    (see `autotune_candidates`), the rest with the split that had the highest throughput.
+    """
+
+    def __init__(
+        self,
+        n_workers: int,
+        max_retries: int = 0,
+        job_finished: Optional[Callable[[Job], None]] = None,
+        all_finished: Optional[Callable[[], None]] = None,
+        cores: Optional[int] = None,
+        pin_cpus: bool = False,
+        autotune: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.job_finished = job_finished
+        self.all_finished = all_finished
+        self.jobs: dict[str, Job] = {}
+        # The queue and the job states are only changed inside the loop, `jobs` is guarded by the lock
+        self._queue: deque[Job] = deque()
+        self._lock = threading.Lock()
+        self._changed = asyncio.Event()
+        self._stopped = False
+        self._first_start: Optional[float] = None
+
+        self.cpus = available_cpus()
+        self.cores = min(cores, len(self.cpus)) if cores else len(self.cpus)
+        self.pin_cpus = pin_cpus and hasattr(os, "sched_setaffinity")
+
+        # Workers with a slot number >= concurrency wait, so autotune can change the concurrency
+        self.concurrency = n_workers
+        self._candidates: list[int] = []
+        self._trial_started = 0
+        self._trial_runs: list[tuple[float, float]] = []
+        self.autotune_results: dict[int, float] = {}  # concurrency -> jobs/min
+        if autotune:
+            self._candidates = autotune_candidates(n_workers)
+            self.concurrency = self._candidates[0]
+
+        self._loop = BackgroundLoop()
+        self._workers = [self._loop.submit(self._work(slot)) for slot in range(n_workers)]
+
+    def submit(
+        self,
+        identifier: str,
+        ccx_path: Path,
+        job_dir: Path,
+        job_name: str,
+        **run_arguments,
+    ) -> Job:
+        """
+        Queues a job, the remaining keyword arguments are passed on to `run_ccx_async`.
+        """
+        job = Job(
+            identifier,
+            {
+                "ccx_path": ccx_path,
+                "job_dir": job_dir,
+                "job_name": job_name,
+                **run_arguments,
+            },
+        )
+        with self._lock:
+            self.jobs[identifier] = job
+        self._loop.call(self._enqueue, job)
+        return job
+
+    def cancel(self, identifier: str):
+        """
+        Removes a queued job or terminates the ccx process of a running one.
+        """
+        self._loop.call(self._cancel, identifier)
+
+    def cancel_all(self):
+        for identifier in list(self.jobs):
+            self.cancel(identifier)
+
+    def retry_failed(self):
+        """
+        Queues all failed jobs once more.
+        """
+        self._loop.call(self._retry_failed)
+
+    def shutdown(self):
+        """
+        Cancels everything, stops the workers and the loop.
+        """
+        self._loop.submit(self._shutdown())
+
+    @property
+    def threads_per_job(self) -> int:
+        return max(1, self.cores // self.concurrency)
+
+    @property
+    def is_tuning(self) -> bool:
+        return bool(self._candidates)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(job.state == JobState.QUEUED for job in list(self.jobs.values()))
+
+    @property
+    def running(self) -> int:
+        return sum(job.state == JobState.RUNNING for job in list(self.jobs.values()))
+
+    @property
+    def throughput(self) -> float:
+        """
+        Completed jobs per minute since the first job was started.
+        """
+        if self._first_start is None:
+            return 0.0
+        done = sum(job.state == JobState.DONE for job in list(self.jobs.values()))
+        minutes = (time.time() - self._first_start) / 60
+        return done / minutes if minutes > 0 else 0.0
+
+    # Everything below runs inside the loop
+
+    def _notify(self):
+        """
+        Wakes up all waiting workers.
+        """
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _enqueue(self, job: Job):
+        self._queue.append(job)
+        self._notify()
+
+    def _cancel(self, identifier: str):
+        job = self.jobs[identifier]
+        if job.is_finished:
+            return
+        was_queued = job.state == JobState.QUEUED
+        job.state = JobState.CANCELLED
+        if was_queued:
+            self._job_done(job)
+        elif job.task is not None:
+            job.task.cancel()  # terminates ccx
+
+    def _retry_failed(self):
+        for job in list(self.jobs.values()):
+            if job.state == JobState.FAILED:
+                job.state = JobState.QUEUED
+                self._queue.append(job)
+        self._notify()
+
+    async def _shutdown(self):
+        for identifier in list(self.jobs):
+            self._cancel(identifier)
+        self._stopped = True
+        self._notify()
+        await asyncio.gather(
+            *(asyncio.wrap_future(worker) for worker in self._workers),
+            return_exceptions=True,
+        )
+        self._loop.loop.stop()
+
+    def _next_job(self, slot: int) -> Optional[Job]:
+        may_start = slot < self.concurrency and not (
+            self.is_tuning and self._trial_started >= self.concurrency
+        )
+        while may_start and self._queue:
+            job = self._queue.popleft()
+            if job.state != JobState.QUEUED:
+                continue  # cancelled while waiting
+            job.state = JobState.RUNNING
+            job.attempts += 1
+            job.process = None
+            job.start_time = time.time()
+            job.threads = self.threads_per_job
+            job.cpus = None
+            if self.pin_cpus:
+                first = slot * job.threads
+                job.cpus = [
+                    self.cpus[(first + i) % len(self.cpus)] for i in range(job.threads)
+                ]
+            if self._first_start is None:
+                self._first_start = job.start_time
+            if self.is_tuning:
+                self._trial_started += 1
+            return job
+        return None
+
+    async def _work(self, slot: int):
+        while not self._stopped:
+            job = self._next_job(slot)
+            if job is None:
+                await self._changed.wait()
+                continue
+
+            threads = str(job.threads)
+            job.task = asyncio.create_task(
+                run_ccx_async(
+                    process_holder=job,
+                    identifier=job.identifier,
+                    env={"OMP_NUM_THREADS": threads, "CCX_NPROC_EQUATION_SOLVER": threads},
+                    cpus=job.cpus,
+                    timeout=self.timeout,
+                    **job.run_arguments,
+                )
+            )
+            return_code: Optional[int] = None
+            try:
+                job.result = await job.task
+                return_code = job.result.return_code
+            except asyncio.CancelledError:
+                if job.state != JobState.CANCELLED:
+                    raise  # the worker itself was cancelled
+            except OSError as error:  # ccx could not be started
+                console_out_lines = job.run_arguments.get("console_out_lines")
+                if console_out_lines:
+                    console_out_lines([f"ccx could not be started: {error}"], job.identifier)
+                return_code = -1
+
+            job.return_code = return_code
+            job.end_time = time.time()
+            if self.is_tuning:
+                self._trial_runs.append((job.start_time, job.end_time))  # type: ignore
+                self._update_autotune()
+            if job.state == JobState.CANCELLED:
+                pass
+            elif return_code == 0:
+                job.state = JobState.DONE
+            elif job.attempts <= self.max_retries:
+                job.state = JobState.QUEUED
+                self._queue.append(job)
+                self._notify()
+                continue
+            else:
+                job.state = JobState.FAILED
+            self._job_done(job)
+
+    def _update_autotune(self):
+        """
+        Finishes the current autotune trial once all its jobs are done (or no job is left to start),
+        then moves on to the next candidate or settles on the best one.
+        """
+        if len(self._trial_runs) < self._trial_started:
+            return
+        nothing_queued = not any(job.state == JobState.QUEUED for job in self._queue)
+        if self._trial_started < self.concurrency and not nothing_queued:
+            return
+
+        start = min(run[0] for run in self._trial_runs)
+        end = max(run[1] for run in self._trial_runs)
+        self.autotune_results[self.concurrency] = (
+            60 * len(self._trial_runs) / max(end - start, 1e-9)
+        )
+        self._trial_started = 0
+        self._trial_runs = []
+        self._candidates.pop(0)
+        if self._candidates:
+            self.concurrency = self._candidates[0]
+        else:
+            self.concurrency = max(
+                self.autotune_results, key=lambda c: self.autotune_results[c]
+            )
+        self._notify()
+
+    def _job_done(self, job: Job):
+        if self.job_finished:
+            self.job_finished(job)
+        with self._lock:
+            all_done = all(job.is_finished for job in self.jobs.values())
+        if all_done and self.all_finished:
+            self.all_finished()
@@ -0,0 +1,149 @@
+import math
+from typing import Optional, Sequence
+
+import numpy as np
+
+# A link of the mode tracking is ambiguous if another mode comes this close to its MAC
+MAC_MARGIN = 0.1
+
+
+class SpeedGroup:
+    """
+    Speeds (indices into the speed list) that reuse the eigenmodes of the full solve at `reference`.
+    """
+
+    __slots__ = ("reference", "members")
+
+    def __init__(self, reference: int, members: list[int]) -> None:
+        self.reference = reference
+        self.members = members
+
+    def __repr__(self) -> str:
+        return f"SpeedGroup {self.reference}: {self.members}"
+
+
+def group_speeds(speeds: list[float], tolerance: float) -> list[SpeedGroup]:
+    """
+    Splits the speeds into groups, so that every speed is within `tolerance` (relative) of the reference
+    speed of its group. Going up from the lowest speed, each reference is the highest speed that still
+    covers the lowest one not in a group yet, which gives the fewest groups.
+    With a tolerance of 0, every speed (but duplicates) is a reference of its own.
+    """
+    order = sorted(range(len(speeds)), key=lambda index: speeds[index])
+    groups: list[SpeedGroup] = []
+    position = 0
+    while position < len(order):
+        lowest = speeds[order[position]]
+        reference = position
+        while (
+            reference + 1 < len(order)
+            and lowest >= speeds[order[reference + 1]] * (1 - tolerance)
+        ):
+            reference += 1
+        limit = speeds[order[reference]] * (1 + tolerance)
+        end = reference + 1
+        while end < len(order) and speeds[order[end]] <= limit:
+            end += 1
+        groups.append(
+            SpeedGroup(
+                order[reference],
+                [order[index] for index in range(position, end) if index != reference],
+            )
+        )
+        position = end
+    return groups
+
+
+class SweepReport:
+    """
+    Wall times of the speed steps of a sweep and the time the reuse of eigenmodes saved, per speed step
+    against the full solve of its reference.
+    """
+
+    def __init__(self) -> None:
+        self.wall_times: dict[str, float] = {}
+        self.saved: dict[str, float] = {}
+
+    def add(self, name: str, wall_time: float, reference: Optional[str] = None) -> Optional[float]:
+        """
+        Records the wall time of a speed step, returns the time saved if it reused the eigenmodes of
+        `reference`.
+        """
+        self.wall_times[name] = wall_time
+        full_time = self.wall_times.get(reference) if reference is not None else None
+        if full_time is None:
+            return None
+        self.saved[name] = full_time - wall_time
+        return self.saved[name]
+
+    def summary(self) -> str:
+        if not self.saved:
+            return ""
+        saved = sum(self.saved.values())
+        total = sum(self.wall_times.values())
+        return (
+            f"Eigenmodes reused for {len(self.saved)} of {len(self.wall_times)} speeds:"
+            f" {saved:.1f} s saved against full solves ({100 * saved / (saved + total):.0f} %)"
+        )
+
+
+def refine_speeds(
+    speeds: Sequence[float],
+    frequencies: Sequence[np.ndarray],
+    macs: Sequence[np.ndarray],
+    chains: list[list[int]],
+    min_mac: float,
+    frequency_tolerance: float,
+    speed_resolution: float,
+    engine_orders: int = 3,
+    mac_margin: float = MAC_MARGIN,
+) -> list[float]:
+    """
+    Speeds to add to a sweep where it is too coarse to resolve the Campbell diagram. `speeds` are sorted
+    [rad/s], `frequencies[i]` are the eigenfrequencies [Hz] at speed `i`, `macs` and `chains` are the
+    input and the result of `track_modes`.
+
+    The interval between two neighbouring speeds gets a speed in its middle, if a mode across it
+      - is tracked ambiguously: its link has a MAC below `min_mac` or a competing mode within
+        `mac_margin`, or its chain begins or ends there,
+      - curves so much that a straight line over the interval is off by more than `frequency_tolerance`
+        (estimated from the second difference with the neighbouring speeds),
+      - crosses one of the engine order lines.
+    Intervals of `speed_resolution` or less are not split, so an adaptive sweep is done once no interval
+    is flagged or all flagged ones are that narrow.
+    """
+    speeds = np.asarray(speeds, dtype=float)
+    flagged = np.zeros(max(len(speeds) - 1, 0), dtype=bool)
+    for chain in chains:
+        for i in range(len(flagged)):
+            a, b = chain[i], chain[i + 1]
+            if a == -1 or b == -1:
+                flagged[i] |= a != b  # the chain begins or ends here
+                continue
+            mac = macs[i]
+            competitor = max(
+                np.delete(mac[a], b).max(initial=0), np.delete(mac[:, b], a).max(initial=0)
+            )
+            if mac[a, b] < min_mac or competitor > mac[a, b] - mac_margin:
+                flagged[i] = True
+            for order in range(1, engine_orders + 1):
+                # distance to the engine order line, f = order * speed / 2 pi
+                before = frequencies[i][a] - order * speeds[i] / (2 * math.pi)
+                after = frequencies[i + 1][b] - order * speeds[i + 1] / (2 * math.pi)
+                if np.sign(before) != np.sign(after):
+                    flagged[i] = True
+
+        for i in range(1, len(flagged)):
+            modes = chain[i - 1], chain[i], chain[i + 1]
+            widths = speeds[i] - speeds[i - 1], speeds[i + 1] - speeds[i]
+            if -1 in modes or 0 in widths:
+                continue
+            f_0, f_1, f_2 = (frequencies[i + step][mode] for step, mode in enumerate(modes, start=-1))
+            curvature = 2 * ((f_2 - f_1) / widths[1] - (f_1 - f_0) / widths[0]) / sum(widths)
+            for interval, width in zip((i - 1, i), widths):
+                # largest deviation of the parabola from its chord
+                if abs(curvature) * width**2 / 8 > frequency_tolerance:
+                    flagged[interval] = True
+
+    split = flagged & (np.diff(speeds) > speed_resolution)
+    return ((speeds[:-1][split] + speeds[1:][split]) / 2).tolist()
@@ -1,98 +1,187 @@
+from ccx_runner.ccx_logic.dispatch import step_dispatcher
+from ccx_runner.ccx_logic.history import ColumnStore
 from ccx_runner.ccx_logic.static.increment import Increment
 from ccx_runner.ccx_logic.static.iteration import Iteration
-from typing import TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from ccx_runner.gui.hauptfenster import Hauptfenster
-
-
-import re
-from typing import Any
+from ccx_runner.ccx_logic.progress import ProgressEvent, ProgressListener, ProgressType
+from typing import Any, Optional
+
+import numpy as np
+
+TABLE_COLUMNS = ("Increment #", "Attempt", "Iterations #", "delta Time", "total Time")
+# the increment table column shown in each table column
+TABLE_DATA = ("number", "attempt", "iterations", "incremental_time", "total_time")
+INCREMENT_COLUMNS = {
+    "number": np.int64,
+    "attempt": np.int64,
+    "first_iteration": np.int64,  # row in the iteration table
+    "iterations": np.int64,
+    "incremental_time": np.float64,
+    "total_time": np.float64,
+}
+ITERATION_COLUMNS = {"increment": np.int64, "number": np.int64}
+# handler method -> pattern of the lines it parses
+DISPATCHER = step_dispatcher(
+    {
+        "parse_increment": r"increment (\d+) attempt (\d+)",
+        "parse_increment_size": r"increment size=[ \t]*(\S+)",
+        "parse_total_time": r"actual total time=[ \t]*(\S+)",
+        "parse_iteration": r"iteration (\d+)[ \t]*$",
+        # e.g. "largest residual force= 6.161463e-03 in node 1234 and dof 1"
+        "parse_residual": r"(average force|time avg\. forc|largest residual force"
+        r"|largest increment of disp|largest correction to disp)[^=\n]*=[ \t]*(\S+)",
+    }
+)
 
 
 class StaticStep:
-    def __init__(self, fenster: "Hauptfenster", number: int) -> None:
-        self.fenster = fenster
+    dispatcher = DISPATCHER
+
+    def __init__(
+        self, listener: Optional[ProgressListener], number: int, keep_lines: bool = True
+    ) -> None:
+        self.listener = listener
         self.number = number
+        self.keep_lines = keep_lines  # whether the raw lines are kept in `parsed_lines`
         self.parsed_lines: list[str] = []
-        self.increments: list[Increment] = []
+        # The history is stored columnar, one row per increment and per iteration. The residuals are
+        # float columns of the iteration table, added as they appear.
+        self.increment_table = ColumnStore(INCREMENT_COLUMNS)
+        self.iteration_table = ColumnStore(ITERATION_COLUMNS)
+        self.residual_channels: list[str] = []
 
     @property
     def name(self) -> str:
         return f"StaticStep {self.number}"
 
     @property
-    def cur_increment(self):
-        return self.increments[-1]
+    def increments(self) -> list[Increment]:
+        return [Increment(self, index) for index in range(len(self.increment_table))]
 
     @property
-    def cur_iteration(self):
-        return self.cur_increment.iterations[-1]
+    def cur_increment(self) -> Increment:
+        return Increment(self, len(self.increment_table) - 1)
 
     @property
-    def tabular_data(self) -> dict[str, tuple[Any, ...]]:
-        data: dict[str, tuple[Any, ...]] = {
-            "Increment #": tuple(inc.number for inc in reversed(self.increments)),
-            "Attempt": tuple(inc.attempt for inc in reversed(self.increments)),
-            "Iterations #": tuple(
-                len(inc.iterations) for inc in reversed(self.increments)
-            ),
-            "delta Time": tuple(
-                inc.incremental_time for inc in reversed(self.increments)
-            ),
-            "total Time": tuple(inc.total_time for inc in reversed(self.increments)),
+    def cur_iteration(self) -> Iteration:
+        return Iteration(self, len(self.iteration_table) - 1)
+
+    @property
+    def tabular_data(self) -> dict[str, np.ndarray]:
+        """
+        The table columns, newest increment first (views into the increment table).
+        """
+        return {
+            header: self.increment_table.column(column)[::-1]
+            for header, column in zip(TABLE_COLUMNS, TABLE_DATA)
         }
-        return data
 
     @property
-    def residuals(self) -> dict[str, tuple[float, ...]]:
-        if self.increments:
-            return self.increments[-1].residuals
+    def table_columns(self) -> tuple[str, ...]:
+        return TABLE_COLUMNS
+
+    def table_rows(self, start: int = 0) -> list[tuple[Any, ...]]:
+        """
+        The table rows of the increments from `start` on, in chronological order.
+        """
+        columns = [self.increment_table.column(column, start).tolist() for column in TABLE_DATA]
+        return [
+            tuple(None if value != value else value for value in row)  # NaN: not known yet
+            for row in zip(*columns)
+        ]
+
+    @property
+    def residuals(self) -> dict[str, np.ndarray]:
+        """
+        The residuals of the current increment (zero copy views).
+        """
+        if len(self.increment_table):
+            return self.cur_increment.residuals
         else:
             return {}
 
+    @property
+    def residual_key(self):
+        """
+        Every increment starts a new series of residuals.
+        """
+        return len(self.increment_table)
+
     def parse(self, line: str):
-        # INCREMENT DATA
-        # new increment
-        if line.startswith("increment") and "attempt" in line:
-            # Get the increment number and attempt number using regex
-            re_match = re.search("increment (\\d+) attempt (\\d+)", line)
-            if re_match:
-                increment_number = int(re_match.group(1))
-                attempt = int(re_match.group(2))
-                self.increments.append(Increment(self, increment_number, attempt))
-
-        # increment size
-        if "increment size=" in line:
-            size = float(line.partition("=")[-1])
-            if self.increments:
-                self.increments[-1].incremental_time = size
-
-        if "actual total time=" in line:
-            total_time = float(line.partition("=")[-1])
-            if self.increments:
-                self.increments[-1].total_time = total_time
-
-        # ITERATION DATA
-        if line.startswith("iteration"):
-            self.fenster.update_solver_status()
-            number = int(line.partition(" ")[-1])
-            if self.increments:
-                self.increments[-1].iterations.append(
-                    Iteration(self.increments[-1], number)
+        found = self.dispatcher.match(line)
+        if found is not None and found[0] != "select_step":
+            getattr(self, found[0])(*found[1])
+        if self.keep_lines:
+            self.parsed_lines.append(line)
+
+    def parse_increment(self, number: str, attempt: str):
+        self.increment_table.append_row(
+            {
+                "number": int(number),
+                "attempt": int(attempt),
+                "first_iteration": len(self.iteration_table),
+                "iterations": 0,
+            }
+        )
+        if self.listener:
+            self.listener(
+                ProgressEvent(
+                    ProgressType.INCREMENT,
+                    self.name,
+                    increment=int(number),
+                    attempt=int(attempt),
+                )
+            )
+
+    def parse_increment_size(self, size: str):
+        if len(self.increment_table):
+            self.increment_table.set_last("incremental_time", float(size))
+
+    def parse_total_time(self, total_time: str):
+        if len(self.increment_table):
+            self.increment_table.set_last("total_time", float(total_time))
+            if self.listener:
+                increment = self.cur_increment
+                self.listener(
+                    ProgressEvent(
+                        ProgressType.TIME,
+                        self.name,
+                        increment=increment.number,
+                        incremental_time=increment.incremental_time,
+                        total_time=increment.total_time,
+                    )
                 )
 
-        # Residuals of the iteration
-        searchwords = (
-            "average force",
-            "time avg. forc",
-            "largest residual force",
-            "largest increment of disp",
-            "largest correction to disp",
-        )
-        for searchword in searchwords:
-            if line.startswith(searchword) and "=" in line:
-                value = float(line.split(" ")[-1])
-                self.cur_iteration.data[searchword] = value
+    def parse_iteration(self, number: str):
+        if len(self.increment_table):
+            self.iteration_table.append_row(
+                {"increment": len(self.increment_table) - 1, "number": int(number)}
+            )
+            iterations = self.increment_table.columns["iterations"]
+            iterations.set_last(iterations[-1] + 1)
+            if self.listener:
+                self.listener(
+                    ProgressEvent(
+                        ProgressType.ITERATION,
+                        self.name,
+                        increment=self.cur_increment.number,
+                        iteration=int(number),
+                    )
+                )
+
+    def parse_residual(self, channel: str, value: str):
+        if len(self.iteration_table):
+            self.iteration_table.set_last(channel, float(value))
+            if channel not in self.residual_channels:
+                self.residual_channels.append(channel)
+            if self.listener:
+                self.listener(
+                    ProgressEvent(
+                        ProgressType.RESIDUAL,
+                        self.name,
+                        increment=self.cur_increment.number,
+                        iteration=self.cur_iteration.number,
+                        name=channel,
+                        value=float(value),
+                    )
+                )
 
-        self.parsed_lines.append(line)
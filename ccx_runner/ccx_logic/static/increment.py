@@ -1,28 +1,71 @@
+import numpy as np
+from ccx_runner.ccx_logic.static.iteration import Iteration
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from ccx_runner.ccx_logic.step import Step
-    from ccx_runner.ccx_logic.static.iteration import Iteration
+    from ccx_runner.ccx_logic.static.StaticStep import StaticStep
 
 
 class Increment:
-    def __init__(self, step: "Step", number: int, attempt: int) -> None:
+    """
+    View of one increment in the columnar history of its step (see `StaticStep.increment_table`).
+    """
+
+    __slots__ = ("step", "index")
+
+    def __init__(self, step: "StaticStep", index: int) -> None:
         self.step = step
-        self.number = number
-        self.attempt = attempt
-        self.total_time: float | None = None
-        self.incremental_time: float | None = None
-        self.iterations: list[Iteration] = []
+        self.index = index
+
+    def _get(self, column: str):
+        return self.step.increment_table.columns[column][self.index]
+
+    @property
+    def number(self) -> int:
+        return int(self._get("number"))
+
+    @property
+    def attempt(self) -> int:
+        return int(self._get("attempt"))
+
+    @property
+    def total_time(self) -> float | None:
+        value = float(self._get("total_time"))
+        return None if np.isnan(value) else value
+
+    @property
+    def incremental_time(self) -> float | None:
+        value = float(self._get("incremental_time"))
+        return None if np.isnan(value) else value
+
+    @property
+    def iteration_range(self) -> range:
+        """
+        Rows of the iterations in `StaticStep.iteration_table`.
+        """
+        first = int(self._get("first_iteration"))
+        return range(first, first + int(self._get("iterations")))
+
+    @property
+    def iterations(self) -> list[Iteration]:
+        return [Iteration(self.step, row) for row in self.iteration_range]
 
     @property
     def name(self) -> str:
         return f"Increment {self.number} attempt {self.attempt}"
 
     @property
-    def residuals(self):
-        resid: dict[str, tuple[float,...]] = {}
-        if self.iterations:
-            keys = tuple(self.iterations[0].data.keys())
-            for key in keys:
-                resid[key] = tuple(iteration.data.get(key,0) for iteration in self.iterations)
-        return resid
+    def residuals(self) -> dict[str, np.ndarray]:
+        """
+        The residuals of the iterations, as views into the iteration table.
+        Only the residuals of the first iteration are taken, missing values are NaN.
+        """
+        rows = self.iteration_range
+        if not rows:
+            return {}
+        table = self.step.iteration_table
+        return {
+            channel: table.column(channel, rows.start, rows.stop)
+            for channel in self.step.residual_channels
+            if not np.isnan(table.columns[channel][rows.start])
+        }
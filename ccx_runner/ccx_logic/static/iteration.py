@@ -1,11 +1,40 @@
+import numpy as np
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from ccx_runner.ccx_logic.static.StaticStep import StaticStep
     from ccx_runner.ccx_logic.static.increment import Increment
 
 
 class Iteration:
-    def __init__(self, increment: "Increment", number: int) -> None:
-        self.increment = increment
-        self.number = number
-        self.data: dict[str, float] = {}
+    """
+    View of one iteration in the columnar history of its step (see `StaticStep.iteration_table`).
+    """
+
+    __slots__ = ("step", "index")
+
+    def __init__(self, step: "StaticStep", index: int) -> None:
+        self.step = step
+        self.index = index
+
+    @property
+    def increment(self) -> "Increment":
+        from ccx_runner.ccx_logic.static.increment import Increment
+
+        return Increment(self.step, int(self.step.iteration_table.columns["increment"][self.index]))
+
+    @property
+    def number(self) -> int:
+        return int(self.step.iteration_table.columns["number"][self.index])
+
+    @property
+    def data(self) -> dict[str, float]:
+        """
+        The residuals of the iteration (a copy).
+        """
+        table = self.step.iteration_table
+        values = {
+            channel: float(table.columns[channel][self.index])
+            for channel in self.step.residual_channels
+        }
+        return {channel: value for channel, value in values.items() if not np.isnan(value)}
@@ -1,39 +1,84 @@
-import re
-from ccx_runner.ccx_logic.static.StaticStep import StaticStep
-from ccx_runner.ccx_logic.step import Step, DynamicStep
-from ccx_runner.ccx_logic.static.increment import Increment
-from ccx_runner.ccx_logic.static.iteration import Iteration
+from ccx_runner.ccx_logic.dispatch import LineDispatcher, step_dispatcher
+from ccx_runner.ccx_logic.progress import ProgressEvent, ProgressListener, ProgressType
 from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
-    from ccx_runner.gui.hauptfenster import Hauptfenster
+    from ccx_runner.ccx_logic.step import Step
+
+PREAMBLE_DISPATCHER = step_dispatcher({})
+
+
+def step_type(kind: str) -> type["Step"]:
+    """
+    The step class of "Static" or "Dynamic" analyses. The steps (and numpy with them) are only
+    imported once the first step is found, to keep the startup fast.
+    """
+    if kind == "Static":
+        from ccx_runner.ccx_logic.static.StaticStep import StaticStep
+
+        return StaticStep
+    from ccx_runner.ccx_logic.step import DynamicStep
+
+    return DynamicStep
 
 
 class CalculixStatus:
-    def __init__(self, hauptfenster: "Hauptfenster") -> None:
-        self.hauptfenster = hauptfenster
+    """
+    Parses the ccx output. Every line is matched once, against the dispatcher of the current step,
+    which also recognizes the start of the next step. With `keep_lines` off, the steps do not keep
+    the raw lines. The progress (new steps, increments, iterations, residuals, ...) is reported
+    to `listener` as `ProgressEvent`s.
+    """
+
+    def __init__(
+        self, listener: Optional[ProgressListener] = None, keep_lines: bool = True
+    ) -> None:
+        self.listener = listener
+        self.keep_lines = keep_lines
         self.running = False
-        self.steps: list[Step] = []
+        self.steps: list["Step"] = []
 
-    def parse(self, line: str, identifier:Optional[str]=None):
+    @property
+    def dispatcher(self) -> LineDispatcher:
+        return self.steps[-1].dispatcher if self.steps else PREAMBLE_DISPATCHER
+
+    def parse(self, line: str, identifier: Optional[str] = None):
         line = line.strip()
 
-        # check if a new STEP was found first
-        if line.endswith("was selected"):
-            typ_str = line.partition("was")[0].strip()
-            step = None
-            if typ_str == "Static analysis":
-                step = StaticStep
-            if typ_str == "Dynamic analysis":
-                step = DynamicStep
-            if step:
-                number = len(self.steps) + 1
-                self.steps.append(step(self.hauptfenster, number))
-                self.hauptfenster.reset_residual_plot()
-
-        # relay the line to the corresponding step
-        if self.steps:
-            self.steps[-1].parse(line)
+        found = self.dispatcher.match(line)
+        if found is not None:
+            self.handle(*found)
+
+        if self.steps and self.keep_lines:
+            self.steps[-1].parsed_lines.append(line)
+
+    def parse_lines(self, lines: list[str], identifier: Optional[str] = None):
+        """
+        Parses a batch of lines. Without `keep_lines`, the batch is scanned as one text,
+        so only the lines matching a rule are handled in Python.
+        """
+        if self.keep_lines:
+            for line in lines:
+                self.parse(line, identifier)
+            return
+
+        text = "\n".join(lines)
+        position: Optional[int] = 0
+        while position is not None:
+            start, position = position, None
+            for handler, arguments, end in self.dispatcher.scan(text, start):
+                self.handle(handler, arguments)
+                if handler == "select_step":
+                    position = end  # continue with the dispatcher of the new step
+                    break
+
+    def handle(self, handler: str, arguments: tuple[str, ...]):
+        if handler == "select_step":
+            # a new STEP was found
+            number = len(self.steps) + 1
+            step = step_type(arguments[0])(self.listener, number, self.keep_lines)
+            self.steps.append(step)
+            if self.listener:
+                self.listener(ProgressEvent(ProgressType.STEP, step.name, number=number))
         else:
-            # parse the preamble
-            pass
+            getattr(self.steps[-1], handler)(*arguments)
@@ -1,77 +1,135 @@
 from enum import StrEnum, auto
-from typing import Protocol, Callable, Any
+from typing import Protocol, Callable, Any, Optional
 
+import numpy as np
 
-from typing import TYPE_CHECKING
-
-if TYPE_CHECKING:
-    from ccx_runner.gui.hauptfenster import Hauptfenster
+from ccx_runner.ccx_logic.dispatch import LineDispatcher, step_dispatcher
+from ccx_runner.ccx_logic.history import ColumnStore, GrowableArray
+from ccx_runner.ccx_logic.progress import ProgressEvent, ProgressListener, ProgressType
 
 
 class Step(Protocol):
+    dispatcher: LineDispatcher
     parsed_lines: list[str]
 
     @property
     def name(self) -> str: ...
     def parse(self, line: str): ...
     @property
-    def residuals(self) -> dict[str, tuple[float, ...]]: ...
+    def residuals(self) -> dict[str, np.ndarray]: ...
+    @property
+    def tabular_data(self) -> dict[str, np.ndarray]: ...
     @property
-    def tabular_data(self) -> dict[str, tuple[Any, ...]]: ...
+    def table_columns(self) -> tuple[str, ...]: ...
+    def table_rows(self, start: int = 0) -> list[tuple[Any, ...]]: ...
+    @property
+    def residual_key(self) -> Any: ...
+
+
+INCREMENT_COLUMNS = {"Increment #": np.int64, "Total time": np.float64}
+# handler method -> pattern of the lines it parses
+DISPATCHER = step_dispatcher(
+    {
+        "parse_total_time": r"actual total time=[ \t]*(\S+)",
+        "parse_energy": r"(internal energy|kinetic energy|elastic contact energy"
+        r"|energy lost due to friction|total energy)[^=\n]*=[ \t]*(\S+)",
+    }
+)
 
 
 class DynamicStep:
-    def __init__(self, fenster: "Hauptfenster", number: int) -> None:
-        self.fenster = fenster
+    dispatcher = DISPATCHER
+
+    def __init__(
+        self, listener: Optional[ProgressListener], number: int, keep_lines: bool = True
+    ) -> None:
+        self.listener = listener
         self.number = number
-        self.increments: list[dict[str, float | int | str]] = []
+        self.keep_lines = keep_lines  # whether the raw lines are kept in `parsed_lines`
+        self.increment_table = ColumnStore(INCREMENT_COLUMNS)
         self.parsed_lines: list[str] = []
-        self._residuals: dict[str, list[float]] = {}
+        self._residuals: dict[str, GrowableArray] = {}
 
     @property
     def name(self) -> str:
         return f"DynamicStep {self.number}"
 
     @property
-    def cur_increment(self):
-        return self.increments[-1]
+    def increments(self) -> list[dict[str, Any]]:
+        return [self.increment_table.row(index) for index in range(len(self.increment_table))]
 
     @property
-    def residuals(self) -> dict[str, tuple[float, ...]]:
-        return {key: tuple(value) for key, value in self._residuals.items()}
+    def cur_increment(self) -> dict[str, Any]:
+        return self.increment_table.row(len(self.increment_table) - 1)
 
     @property
-    def tabular_data(self) -> dict[str, tuple[Any, ...]]:
-        if not self.increments:
-            return {}
+    def residuals(self) -> dict[str, np.ndarray]:
+        """
+        The residuals of all increments (zero copy views).
+        """
+        return {key: value.view for key, value in list(self._residuals.items())}
 
-        data = {key: [] for key in self.increments[0].keys()}
-        for increment_data in reversed(self.increments):
-            for key, value in increment_data.items():
-                data[key].append(value)
+    @property
+    def residual_key(self):
+        """
+        The residuals of a dynamic step form one series for the whole step.
+        """
+        return self.number
 
-        return {key: tuple(value) for key, value in data.items()}
+    @property
+    def table_columns(self) -> tuple[str, ...]:
+        return tuple(INCREMENT_COLUMNS) if len(self.increment_table) else ()
+
+    def table_rows(self, start: int = 0) -> list[tuple[Any, ...]]:
+        """
+        The table rows of the increments from `start` on, in chronological order.
+        """
+        columns = [self.increment_table.column(key, start).tolist() for key in INCREMENT_COLUMNS]
+        return list(zip(*columns))
+
+    @property
+    def tabular_data(self) -> dict[str, np.ndarray]:
+        """
+        The table columns, newest increment first (views into the increment table).
+        """
+        if not len(self.increment_table):
+            return {}
+        return {key: self.increment_table.column(key)[::-1] for key in INCREMENT_COLUMNS}
 
     def parse(self, line: str):
-        if line.startswith("actual total time="):
-            total_time = float(line.partition("=")[-1])
-            self.increments.append(
-                {"Increment #": len(self.increments) + 1, "Total time": total_time}
+        found = self.dispatcher.match(line)
+        if found is not None and found[0] != "select_step":
+            getattr(self, found[0])(*found[1])
+        if self.keep_lines:
+            self.parsed_lines.append(line)
+
+    def parse_total_time(self, total_time: str):
+        number = len(self.increment_table) + 1
+        self.increment_table.append_row({"Increment #": number, "Total time": float(total_time)})
+        if self.listener:
+            self.listener(
+                ProgressEvent(
+                    ProgressType.INCREMENT,
+                    self.name,
+                    increment=number,
+                    total_time=float(total_time),
+                )
+            )
+
+    def parse_energy(self, energy: str, wert: str):
+        try:
+            self._residuals[energy].append(float(wert))
+        except KeyError:
+            residual = GrowableArray()
+            residual.append(float(wert))
+            self._residuals[energy] = residual
+        if self.listener:
+            self.listener(
+                ProgressEvent(
+                    ProgressType.ENERGY,
+                    self.name,
+                    increment=len(self.increment_table),
+                    name=energy,
+                    value=float(wert),
+                )
             )
-            self.fenster.update_solver_status()
-
-        searchwords = (
-            "internal energy",
-            "kinetic energy",
-            "elastic contact energy",
-            "energy lost due to friction",
-            "total energy",
-        )
-        for searchword in searchwords:
-            if line.startswith(searchword):
-                _, _, wert = line.partition("=")
-                wert = float(wert)
-                try:
-                    self._residuals[searchword].append(wert)
-                except KeyError:
-                    self._residuals[searchword] = [wert]
@@ -0,0 +1,126 @@
+"""
+Headless command line interface, e.g. for compute nodes without a display:
+
+    ccx_runner run --job path/to/job.inp --json-events
+
+Runs ccx and monitors it with the same parser as the GUI, without importing dearpygui.
+With `--json-events`, the progress is written to stdout as JSON lines (one event per line):
+
+    {"event": "increment", "step": "StaticStep 1", "increment": 3, "attempt": 1}
+
+The ccx output then only goes to the log file (`<job>.log`), otherwise it is passed through.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+from ccx_runner.ccx_logic.progress import ProgressEvent
+from ccx_runner.ccx_logic.run_ccx_async import CcxResult, run_ccx_async
+from ccx_runner.ccx_logic.status import CalculixStatus
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ccx_runner", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run and monitor a ccx job without the GUI")
+    run.add_argument("--job", required=True, type=Path, help="input deck (with or without .inp)")
+    run.add_argument("--ccx", default="ccx", help="ccx executable (default: ccx on the PATH)")
+    run.add_argument("--json-events", action="store_true", help="write JSON lines events to stdout")
+    run.add_argument("--threads", type=int, help="OMP_NUM_THREADS / CCX_NPROC_EQUATION_SOLVER")
+    run.add_argument("--timeout", type=float, help="terminate ccx after this many seconds")
+    run.add_argument("--output-format", help="ccx result format, e.g. bin")
+    return parser
+
+
+class EventWriter:
+    """
+    Writes events as JSON lines to stdout, flushed after every line so they can be followed live.
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+
+    def write(self, event: dict[str, Any]):
+        if self.enabled:
+            sys.stdout.write(json.dumps(event) + "\n")
+            sys.stdout.flush()
+
+    def progress(self, event: ProgressEvent):
+        self.write(event.to_dict())
+
+
+def finished_event(result: CcxResult) -> dict[str, Any]:
+    return {
+        "event": "finished",
+        "return_code": result.return_code,
+        "wall_time": result.wall_time,
+        "peak_rss": result.peak_rss,
+        "timed_out": result.timed_out,
+        "log": str(result.log_path) if result.log_path else None,
+    }
+
+
+def run(args: argparse.Namespace) -> int:
+    job: Path = args.job
+    job_name = job.stem if job.suffix == ".inp" else job.name
+    job_dir = job.parent
+    if not (job_dir / f"{job_name}.inp").is_file():
+        print(f"Input deck {job_dir / job_name}.inp not found", file=sys.stderr)
+        return 2
+    ccx_path = shutil.which(args.ccx) or args.ccx
+    if not os.path.isfile(ccx_path):
+        print(f"ccx executable {args.ccx} not found", file=sys.stderr)
+        return 2
+
+    events = EventWriter(args.json_events)
+    status = CalculixStatus(events.progress, keep_lines=False)
+    env: Optional[dict[str, str]] = None
+    if args.threads:
+        env = {
+            "OMP_NUM_THREADS": str(args.threads),
+            "CCX_NPROC_EQUATION_SOLVER": str(args.threads),
+        }
+
+    def console_out_lines(lines: list[str], *args):
+        if not events.enabled:
+            sys.stdout.write("".join(line if line.endswith("\n") else line + "\n" for line in lines))
+            sys.stdout.flush()
+
+    events.write({"event": "started", "job": str(job_dir / job_name)})
+    try:
+        result = asyncio.run(
+            run_ccx_async(
+                Path(ccx_path),
+                job_dir,
+                job_name,
+                output_format=args.output_format,
+                env=env,
+                timeout=args.timeout,
+                console_out_lines=console_out_lines,
+                parser_lines=status.parse_lines,
+            )
+        )
+    except KeyboardInterrupt:  # ccx was terminated
+        events.write({"event": "cancelled"})
+        return 130
+    except OSError as error:  # ccx could not be started, e.g. not executable
+        print(f"ccx could not be started: {error}", file=sys.stderr)
+        events.write({"event": "finished", "return_code": None, "error": str(error)})
+        return 1
+
+    events.write(finished_event(result))
+    return result.return_code if result.return_code is not None else 1
+
+
+def cli(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        return run(args)
+    return 2
@@ -1,18 +1,44 @@
 import dearpygui.dearpygui as dpg
-import threading
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
+import multiprocessing
 import numpy as np
+import platformdirs
+import shutil
 import tempfile
+import threading
 import json
+import uuid
 
 from typing import TYPE_CHECKING, Optional
 
 if TYPE_CHECKING:
     from ccx_runner.gui.hauptfenster import Hauptfenster
 
-from ccx_runner.ccx_logic.complex_modal.Eigenvector import Eigenvector
-from ccx_runner.ccx_logic.run_ccx import run_ccx
-from ccx_runner.ccx_logic.result import ResultBlock
+from ccx_runner.ccx_logic.complex_modal.Eigenvector import (
+    Eigenvector,
+    mac_matrix,
+    stack_mode_shapes,
+)
+from ccx_runner.ccx_logic.complex_modal.EigenvectorCache import EigenvectorCache
+from ccx_runner.ccx_logic.complex_modal.NodeIndex import NodeIndex
+from ccx_runner.ccx_logic.complex_modal.read_modes import (
+    cache_modes,
+    cache_variant,
+    cached_modes,
+    read_modes,
+)
+from ccx_runner.ccx_logic.complex_modal.tracking import DEFAULT_FREQUENCY_WEIGHT, track_modes
+from ccx_runner.ccx_logic.input_deck import EIGENMODES, Patch, SharedModel, link_file
+from ccx_runner.ccx_logic.scheduler import Job, JobScheduler, JobState
+from ccx_runner.ccx_logic.speed_sweep import SweepReport, group_speeds, refine_speeds
+from ccx_runner.gui.console import ConsoleBuffer
+
+CONSOLE_TAIL_LINES = 500  # lines shown in the tab of a speed step
+FULL_COMPLEX_STEP_NO = 3  # TODO Change hardcoded Step to something smarter
+RESTART_COMPLEX_STEP_NO = 1  # the only step of a speed step that reuses eigenmodes
+ENGINE_ORDERS = 3  # engine order lines of the Campbell plot
+PARSE_WORKERS = 2  # processes reading the result files of finished speed steps
 
 
 class CampbellAnalysis:
@@ -22,6 +48,27 @@ class CampbellAnalysis:
         self.plot_window = CampbellResultsWindow(self)
 
         self.speed_step_results: list[ComplexModalParseResult] = []
+        self.scheduler: Optional[JobScheduler] = None
+        # speed step -> speed step whose eigenmodes it reads instead of solving the whole chain
+        self.reused_from: dict[str, str] = {}
+        self.sweep_report = SweepReport()
+        self._cancelled = False
+        self.refinement_round = 0
+        # The results of every finished speed step are read right away in worker processes.
+        # `_lock` guards the results and the bookkeeping below, which the scheduler thread and the
+        # callbacks of the workers share. The plot and buttons are only updated by the frame loop.
+        self._lock = threading.RLock()
+        self._parser: Optional[ProcessPoolExecutor] = None
+        self._parsing: set[str] = set()
+        self._waiting: list[str] = []  # speed steps waiting for the node index of the first one
+        self._jobs_done = False
+        self._results_changed = False  # a speed step was read, the plot is redrawn by `update`
+        self._macs: dict[tuple[str, str], np.ndarray] = {}  # MAC matrices of neighbouring speed steps
+        self.analysis_id = ""  # the speed steps of an analysis are cached under it
+        self._shown_tab: Optional[int] = None
+        # The full console output of the speed steps is kept here, the temporary project files are not
+        self.log_dir = Path(platformdirs.user_log_dir("ccx_runner")) / "campbell"
+        self.eigenvector_cache = EigenvectorCache()
 
         self.speeds_tool: list[int] = []  # n, from, to
 
@@ -71,13 +118,71 @@ class CampbellAnalysis:
 
         with dpg.group(horizontal=True, parent=tab_parent):
             dpg.add_button(label="Run Analysis", callback=self.run_campbell_analysis)
+            self.cancel_button = dpg.add_button(
+                label="Cancel Analysis", show=False, callback=self.cancel_analysis
+            )
             self.number_of_threads_input = dpg.add_input_int(
                 default_value=3,
-                label="Number of threads",
+                label="Concurrent jobs",
                 width=100,
                 min_value=1,
                 min_clamped=True,
             )
+            self.cores_input = dpg.add_input_int(
+                default_value=0,
+                label="Cores (0 = all)",
+                width=100,
+                min_value=0,
+                min_clamped=True,
+            )
+            self.pin_cpus_input = dpg.add_checkbox(label="Pin CPUs")
+            self.autotune_input = dpg.add_checkbox(label="Autotune")
+            self.max_retries_input = dpg.add_input_int(
+                default_value=0,
+                label="Retries",
+                width=100,
+                min_value=0,
+                min_clamped=True,
+            )
+            self.min_mac_input = dpg.add_input_float(
+                default_value=0.9,
+                label="Minimum MAC",
+                width=100,
+                min_value=0,
+                max_value=1,
+                min_clamped=True,
+                max_clamped=True,
+            )
+            self.frequency_weight_input = dpg.add_input_float(
+                default_value=DEFAULT_FREQUENCY_WEIGHT,
+                label="Frequency weight",
+                width=100,
+                min_value=0,
+                min_clamped=True,
+            )
+            self.node_subset_input = dpg.add_input_int(
+                default_value=0,
+                label="MAC nodes (0 = all)",
+                width=100,
+                min_value=0,
+                min_clamped=True,
+            )
+            self.reuse_tolerance_input = dpg.add_input_float(
+                default_value=0,
+                label="Reuse eigenmodes within [%]",
+                width=100,
+                min_value=0,
+                max_value=50,
+                min_clamped=True,
+                max_clamped=True,
+            )
+            with dpg.tooltip(self.reuse_tolerance_input):
+                dpg.add_text(
+                    "Speeds within this distance of a fully solved speed only run the complex frequency step,"
+                    " on the stored eigenmodes (STORAGE=YES) of that speed. The centrifugal stiffening of the"
+                    " eigenmodes is then the one of the solved speed, so keep the distance small. 0 = off",
+                    wrap=400,
+                )
             self.show_results_button = dpg.add_button(
                 label="Show Results", show=False, callback=self.plot_window.show
             )
@@ -86,7 +191,43 @@ class CampbellAnalysis:
                 show=False,
                 callback=lambda: dpg.show_item(self.save_dialog),
             )
+            dpg.add_button(
+                label="Load results", callback=lambda: dpg.show_item(self.load_dialog)
+            )
+
+        with dpg.group(horizontal=True, parent=tab_parent):
+            self.adaptive_input = dpg.add_checkbox(label="Adaptive refinement")
+            with dpg.tooltip(self.adaptive_input):
+                dpg.add_text(
+                    "The speeds are a coarse start. Speeds get added in between where the mode tracking is"
+                    " ambiguous, a mode curves more than the frequency tolerance or crosses an engine order"
+                    " line, until the speed resolution is reached.",
+                    wrap=400,
+                )
+            self.frequency_tolerance_input = dpg.add_input_float(
+                default_value=1,
+                label="Frequency tolerance [Hz]",
+                width=100,
+                min_value=0,
+                min_clamped=True,
+            )
+            self.speed_resolution_input = dpg.add_input_float(
+                default_value=10,
+                label="Speed resolution [rpm]",
+                width=100,
+                min_value=0.001,
+                min_clamped=True,
+            )
+            self.max_rounds_input = dpg.add_input_int(
+                default_value=4,
+                label="Max. refinements",
+                width=100,
+                min_value=0,
+                min_clamped=True,
+            )
 
+        self.scheduler_status = dpg.add_text("", parent=tab_parent)
+        self.sweep_report_text = dpg.add_text("", parent=tab_parent)
         self.tab_bar = dpg.add_tab_bar(parent=tab_parent)
 
         with dpg.file_dialog(
@@ -100,6 +241,16 @@ class CampbellAnalysis:
         ) as self.save_dialog:
             dpg.add_file_extension(".json", label="JSON Formatted File")
 
+        with dpg.file_dialog(
+            label="Load Analysis Data",
+            modal=True,
+            show=False,
+            callback=self.callback_confirm_load_results,
+            width=800,
+            height=600,
+        ) as self.load_dialog:
+            dpg.add_file_extension(".json", label="JSON Formatted File")
+
     def callback_step_tool_triggered(self):
         n, start, end = dpg.get_values(self.speeds_tool)
         dpg.set_value(
@@ -111,16 +262,11 @@ class CampbellAnalysis:
         """
         Upon selecting a project file, the available centrifugal loads are to be listed inside the corresponding combo box.
         """
-        # get all available centrif definitions from the .inp file
-        centrif_definitions: list[str] = []
-
-        project_file = self.hauptfenster.project_file_contents
-        if not project_file:
+        deck = self.hauptfenster.input_deck
+        if deck is None:
             return
-        for line in project_file.splitlines():
-            if "centrif" in line.lower() and len(line.split(",")) == 9:
-                name = line.split(",")[0].strip()
-                centrif_definitions.append(name)
+        # all centrif definitions of the .inp file (and its includes)
+        centrif_definitions = list(deck.centrif_loads)
         dpg.configure_item(self.centrif_load_name, items=centrif_definitions)
         if len(centrif_definitions) > 0:
             dpg.set_value(self.centrif_load_name, centrif_definitions[0])
@@ -130,52 +276,10 @@ class CampbellAnalysis:
         """
         Checks the `.inp` file for a `*COMPLEX FREQUENCY, CORIOLIS` step.
         """
-        input_file = self.hauptfenster.project_file_contents
-        if input_file is None:
+        deck = self.hauptfenster.input_deck
+        if deck is None:
             raise ValueError("The input file could not be read.")
-        searchwords = ["*complex frequency", "coriolis"]
-        for line in input_file.splitlines():
-            if all(searchword in line.lower() for searchword in searchwords):
-                return True
-        else:
-            return False
-
-    @property
-    def project_with_added_complex_freq_step(self) -> str:
-        """
-        Returns a modified version of the provided `.inp` file, that appends a `*COMPLEX FREQUENCY, CORIOLIS`
-        step to the project as a duplicate of the last `*FREQUENCY` step.
-        """
-        project_file = self.hauptfenster.project_file_contents
-        if project_file is None:
-            raise ValueError("Project file could not be read!")
-        if self.project_contains_complex_freq_step:
-            return project_file
-        else:
-            # get the frequency step substring
-            start_index: Optional[int] = None
-            end_index: Optional[int] = None
-            lines = [line.strip() for line in project_file.splitlines()]
-            for nr, line in enumerate(lines):
-                if line.lower().startswith("*step") and lines[
-                    nr + 1
-                ].lower().startswith("*frequency"):
-                    start_index = nr
-
-                if start_index is not None and line.lower().startswith("*end step"):
-                    end_index = nr
-                    break
-            if start_index is None or end_index is None:
-                raise ValueError("No Frequency Step found in the .inp file")
-            freq_step_lines = [
-                line.lower()
-                for line in lines[start_index : end_index + 1]
-                if not line.strip().startswith("**")
-            ]
-            freq_step_lines[1] = freq_step_lines[1].replace(
-                "frequency", "complex frequency,coriolis"
-            )
-            return project_file + "\n" + "\n".join(freq_step_lines)
+        return deck.has_complex_frequency_step
 
     @property
     def speeds(self):
@@ -187,67 +291,68 @@ class CampbellAnalysis:
             # convert from rpm to rad/s
             return [rpm_to_rad_s(float(speed)) for speed in speeds_inp.split(",")]
 
+    def tracked_modes(self) -> tuple[list[np.ndarray], list[np.ndarray], list[list[int]]]:
+        """
+        Sorts the speed steps by speed and follows their modes through them.
+        Returns the MAC matrices between neighbouring speed steps, the eigenfrequencies of every speed
+        step and the mode chains (see `track_modes`).
+        """
+        with self._lock:
+            speed_results = self.speed_step_results
+            speed_results.sort(key=lambda res: res.speed)
+
+            # Step 1: Follow the modes through the speed steps by an optimal assignment on the MAC
+            # matrices. They are kept, so a new speed step only gets compared to its two neighbours.
+            # All steps share one node index, so the rows of their stacks already match.
+            macs: list[np.ndarray] = []
+            for res1, res2 in zip(speed_results, speed_results[1:]):
+                mac = self._macs.get((res1.name, res2.name))
+                if mac is None:
+                    mac = mac_matrix(res1.mode_shapes()[1], res2.mode_shapes()[1])
+                    self._macs[res1.name, res2.name] = mac
+                macs.append(mac)
+
+            frequencies = [
+                np.array([mode.eigenfrequency for mode in res.modes.values()])
+                for res in speed_results
+            ]
+        chains = track_modes(
+            macs,
+            frequencies,
+            min_mac=dpg.get_value(self.min_mac_input),
+            frequency_weight=dpg.get_value(self.frequency_weight_input),
+        )
+        return macs, frequencies, chains
+
     @property
     def modal_data(self):
         """
         Read all data from the result files, get matching eigenmodes and output their data as `(speeds[rpm]), {mode_nr:(eigenfrequency[Hz])}`
         """
-        speed_results = self.speed_step_results
-        speed_results.sort(key=lambda res: res.speed)
-
-        # Step 1: Find all matching Eigenvectors that describe the same mode
-        # Initialize Dictionary that holds all nodes that match the key "main" node number from the first step
-        matching_modes: dict[int, list[int]] = {}
-        for mode in speed_results[0].modes.values():
-            matching_modes[mode.mode_nr] = [mode.mode_nr]
-
-        for i in range(len(speed_results)):
-            if i >= len(speed_results) - 1:
-                continue
-
-            res1 = speed_results[i]
-            res2 = speed_results[i + 1]
-
-            for main_mode, found_matches in matching_modes.items():
-                # Get the last confirmed mode to check for a follow-up mode in the new step
-                last_chain_node_nr = found_matches[-1]
-                if last_chain_node_nr != -1:
-                    # The chain continues
-                    ref_mode = res1.modes[last_chain_node_nr]
-                    for mode_nr, mode in res2.modes.items():
-                        mac = ref_mode.mac(mode)
-                        if mac > 0.999999:
-                            found_matches.append(mode_nr)
-                            break
-                    else:
-                        found_matches.append(-1)  # Mark the end of the chain
-                else:
-                    # A follow up mode from the last step could not be found. Therefore the chain was ended (denoted by -1)
-                    pass
+        with self._lock:
+            _, frequencies, chains = self.tracked_modes()
+            speed_results = self.speed_step_results.copy()
 
         # Step 2: Build up a data_array that can be plotted easily
         speeds = [rad_s_to_rpm(res.speed) for res in speed_results]
 
-        freqs = {main_mode: [] for main_mode in matching_modes.keys()}
-        for speedstep in speed_results:
-            for main_mode, found_matches in matching_modes.items():
-                freq_list = []
-                for mode_no in found_matches:
-                    try:
-                        freq_list.append(speedstep.modes[mode_no].eigenfrequency)
-                    except:
-                        freq_list.append(-1)  # No valid frequency
-                # If results are too short, pad them with invalid frequs
-                if len(freq_list) < len(speeds):
-                    freq_list += [-1] * (len(speeds) - len(freq_list))
-                freqs[main_mode] = freq_list
+        # Chains are named after their mode number in the first step, chains that begin later are numbered onwards
+        first_mode_nrs = list(speed_results[0].modes.keys())
+        next_main_mode = max(first_mode_nrs, default=0) + 1
+        freqs: dict[int, list[float]] = {}
+        for chain in chains:
+            if chain[0] != -1:
+                main_mode = first_mode_nrs[chain[0]]
+            else:
+                main_mode = next_main_mode
+                next_main_mode += 1
+            freqs[main_mode] = [
+                float(frequencies[step][mode]) if mode != -1 else -1  # No valid frequency
+                for step, mode in enumerate(chain)
+            ]
 
         return speeds, freqs
 
-    def run_cxx_limited_concurrency(self, **kwargs):
-        with self.thread_pool:
-            run_ccx(**kwargs)
-
     def run_campbell_analysis(self):
         ### Early return checks in case something is missing
         boundary_name = dpg.get_value(self.centrif_load_name)
@@ -256,113 +361,445 @@ class CampbellAnalysis:
         speeds = self.speeds
         if speeds is None:
             return
+        if self.scheduler is not None and not all(
+            job.is_finished for job in self.scheduler.jobs.values()
+        ):
+            return  # an analysis is still running
+        if self._parsing or self._waiting:
+            return  # results of the last analysis are still being read
         dpg.hide_item(self.show_results_button)
         dpg.hide_item(self.save_results_button)
 
         ### HANDLE OUTPUT DIRECTORY ###
-        n_threads = dpg.get_value(self.number_of_threads_input)
-        self.thread_pool = threading.Semaphore(n_threads)
         self.tempdir = tempfile.TemporaryDirectory(
             "ccx_complex_freq_analysis", delete=False
         )
         temp_pfad = Path(self.tempdir.name)
 
-        inp_file = self.project_with_added_complex_freq_step.splitlines()
-
-        line_number: Optional[int] = None
-        for nr, line in enumerate(inp_file):
-            if (
-                boundary_name in line
-                and "centrif" in line.lower()
-                and len(line.split(",")) == 9
-            ):
-                line_number = nr
+        deck = self.hauptfenster.input_deck
+        if deck is None:
+            raise ValueError("Project file could not be read!")
+        # a *COMPLEX FREQUENCY, CORIOLIS step is appended as a duplicate of the *FREQUENCY step, if missing
+        complex_step_patch = deck.complex_frequency_step_patch()
+        centrif_load = deck.centrif_loads.get(boundary_name)
         assert (
-            line_number is not None
+            centrif_load is not None
         ), "For some reason, the specified centrif value was not found inside the .inp file."
 
-        self.project_files: list[tuple[str, float, Path]] = []
-        # Setup a project directory for every speed step
-        for i, speed_rad_s in enumerate(speeds):
-            name = f"simstep_{speed_rad_s}_{i}"
-            project_dir = temp_pfad / name
-            project_dir.mkdir()
-            filepath = project_dir / (name + ".inp")
-
-            # Modify speed value
-            modified_project_file = inp_file.copy()
-            parts = modified_project_file[line_number].split(",")
-            parts[2] = str(
-                speed_rad_s * 2
-            )  # times two because PrePoMax does the same, propably because of tau/s
-            modified_project_file[line_number] = ",".join(parts)
+        # The model is written once and shared by the speed steps, which only differ in their steps
+        self.shared_model = SharedModel(deck, temp_pfad)
+        self.deck = deck
+        self.centrif_load = centrif_load
+        self.complex_step_patch = complex_step_patch
+        # Speeds close to a fully solved one only run the complex frequency step on its eigenmodes
+        self.reuse_tolerance = dpg.get_value(self.reuse_tolerance_input) / 100
+        if self.shared_model.step_start is None:
+            self.reuse_tolerance = 0
+        self.storage_patch = deck.eigenmode_storage_patch() if self.reuse_tolerance else None
+        self.reused_from = {}
+        self.sweep_report = SweepReport()
+        dpg.set_value(self.sweep_report_text, "")
 
-            with open(filepath, "w") as file:
-                file.write("\n".join(modified_project_file))
-            self.project_files.append((name, speed_rad_s, project_dir))
+        self.project_files: list[tuple[str, float, Path]] = []
+        self.complex_step_no: dict[str, int] = {}
+        # patches of a full solve of the speed steps that reuse eigenmodes, in case there are none
+        self.full_patches: dict[str, list[Patch]] = {}
+        self.speed_step_results = []
+        self.node_index: Optional[NodeIndex] = None
+        self.node_subset_size = dpg.get_value(self.node_subset_input)
+        self.analysis_id = uuid.uuid4().hex[:16]
+        self._macs = {}
+        self._jobs_done = False
+        self._results_changed = False
+        self.refinement_round = 0
 
         # run the analysis for every subproject
         dpg.delete_item(self.tab_bar, children_only=True)
         self.project_instance_data = {}
-        for name, speed_rad_s, project_dir in self.project_files:
-            self.project_instance_data[name] = {}
+        self._shown_tab = None
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        if self.scheduler is not None:
+            self.scheduler.shutdown()
+        self.scheduler = JobScheduler(
+            dpg.get_value(self.number_of_threads_input),
+            max_retries=dpg.get_value(self.max_retries_input),
+            job_finished=self.mark_as_finished,
+            all_finished=self.all_thread_complete,
+            cores=dpg.get_value(self.cores_input),
+            pin_cpus=dpg.get_value(self.pin_cpus_input),
+            autotune=dpg.get_value(self.autotune_input),
+        )
+        self._cancelled = False
+        dpg.show_item(self.cancel_button)
+        self.add_speed_steps(speeds)
+
+    def add_speed_steps(self, speeds: list[float]):
+        """
+        Writes a speed step for every speed [rad/s] and starts them.
+        """
+        first = len(self.project_files)
+        names = [f"simstep_{speed_rad_s}_{first + i}" for i, speed_rad_s in enumerate(speeds)]
+        for group in group_speeds(speeds, self.reuse_tolerance):
+            for member in group.members:
+                self.reused_from[names[member]] = names[group.reference]
+
+        # Setup a project directory for every speed step
+        for name, speed_rad_s in zip(names, speeds):
+            # Modify speed value
+            # times two because PrePoMax does the same, propably because of tau/s
+            patches = [self.centrif_load.patch(speed_rad_s * 2)]
+            if self.complex_step_patch is not None:
+                patches.append(self.complex_step_patch)
+            if self.storage_patch is not None:
+                patches.append(self.storage_patch)
+            if name in self.reused_from:
+                filepath = self.shared_model.write_restart_variant(
+                    name, self.deck.eigenmode_restart_step(self.centrif_load, speed_rad_s * 2)
+                )
+                self.full_patches[name] = patches
+                self.complex_step_no[name] = RESTART_COMPLEX_STEP_NO
+            else:
+                filepath = self.shared_model.write_variant(name, patches)
+                self.complex_step_no[name] = FULL_COMPLEX_STEP_NO
+            self.project_files.append((name, speed_rad_s, filepath.parent))
+
+            self.project_instance_data[name] = {"project_dir": filepath.parent}
             with dpg.tab(
                 label=str(round(rad_s_to_rpm(speed_rad_s), 3)), parent=self.tab_bar
-            ):
+            ) as tab:
                 self.project_instance_data[name]["textbox"] = dpg.add_input_text(
                     readonly=True, multiline=True, width=-1, height=-1
                 )
-                self.project_instance_data[name]["running"] = False
-                self.project_instance_data[name]["finished"] = False
-
-            thread = threading.Thread(
-                target=self.run_cxx_limited_concurrency,
-                daemon=True,
-                kwargs={
-                    "ccx_path": self.hauptfenster.ccx_path,
-                    "job_dir": project_dir,
-                    "job_name": name,
-                    "console_out": self.console_out,
-                    "parser": None,
-                    "finished": self.mark_as_finished,
-                    "identifier": name,
-                },
+            self.project_instance_data[name]["tab"] = tab
+            self.project_instance_data[name]["console"] = ConsoleBuffer(
+                max_lines=CONSOLE_TAIL_LINES, log_path=self.log_dir / f"{name}.log"
             )
-            thread.start()
 
-    def console_out(self, line: str, identifier: Optional[str]):
-        textbox = self.project_instance_data[identifier]["textbox"]
-        dpg.set_value(textbox, dpg.get_value(textbox) + line)
+        # the speed steps reusing eigenmodes are started once their reference is done
+        for name in names:
+            if name not in self.reused_from:
+                self.submit(name)
+
+    def submit(self, name: str):
+        project_dir: Path = self.project_instance_data[name]["project_dir"]
+        self.scheduler.submit(  # type: ignore
+            name,
+            ccx_path=self.hauptfenster.ccx_path,
+            job_dir=project_dir,
+            job_name=name,
+            console_out_lines=self.console_out_lines,
+            write_log=False,  # written by the console buffer
+            output_format="bin",  # binary results are smaller and faster to read
+        )
 
-    def mark_as_finished(self, identifier: Optional[str]):
-        self.project_instance_data[identifier]["finished"] = True
-        if all(
-            self.project_instance_data[ident]["finished"]
-            for ident in self.project_instance_data.keys()
-        ):
-            self.all_thread_complete()
+    def start_reusing_speeds(self, reference: Job):
+        """
+        Starts the speed steps that reuse the eigenmodes of a finished full solve. They get a full solve
+        themselves if it failed, and are left out if it was cancelled.
+        """
+        if reference.state == JobState.CANCELLED or self._cancelled:
+            return
+        reference_dir: Path = self.project_instance_data[reference.identifier]["project_dir"]
+        eigenmodes = reference_dir / (reference.identifier + EIGENMODES)
+        for name, reference_name in list(self.reused_from.items()):
+            if reference_name != reference.identifier:
+                continue
+            project_dir: Path = self.project_instance_data[name]["project_dir"]
+            if reference.state == JobState.DONE and eigenmodes.is_file():
+                link_file(eigenmodes, project_dir / (name + EIGENMODES))
+            else:
+                del self.reused_from[name]
+                self.shared_model.write_variant(name, self.full_patches[name])
+                self.complex_step_no[name] = FULL_COMPLEX_STEP_NO
+                self.project_instance_data[name]["console"].append(
+                    [f"No eigenmodes of {reference.identifier} to reuse, running a full solve"]
+                )
+            self.submit(name)
 
-    def all_thread_complete(self):
-        self.speed_step_results = []
-        # Collect all the Modal Analysis result files
-        for name, speed, project_dir in self.project_files:
-            with open(project_dir / (name + ".frd")) as f:
-                self.speed_step_results.append(
-                    ComplexModalParseResult(
-                        f.read(), name, speed, 3
-                    )  # TODO Change hardcoded Step to something smarter
+    def cancel_analysis(self):
+        if self.scheduler is not None:
+            self._cancelled = True
+            self.scheduler.cancel_all()
+
+    def shutdown(self):
+        """
+        Cancels the analysis and stops the worker processes, when the application exits.
+        """
+        self.cancel_analysis()
+        if self._parser is not None:
+            self._parser.shutdown(wait=False, cancel_futures=True)
+
+    def update(self):
+        """
+        This runs for every frame
+        """
+        scheduler = self.scheduler
+        if scheduler is None:
+            return
+        self.update_console_output()
+        with self._lock:
+            results_changed, self._results_changed = self._results_changed, False
+        if results_changed:
+            self.plot_window.callback_results_changed()
+            dpg.show_item(self.show_results_button)
+        self.finish_if_done()
+        dpg.set_value(
+            self.scheduler_status,
+            f"queued: {scheduler.queue_depth}   running: {scheduler.running}"
+            f"   {scheduler.concurrency} jobs x {scheduler.threads_per_job} threads"
+            f"{' (autotuning)' if scheduler.is_tuning else ''}"
+            f"   throughput: {scheduler.throughput:.2f} jobs/min",
+        )
+
+    def update_console_output(self):
+        """
+        Shows the tail of the console output in the active tab, if it changed.
+        Only the active tab gets updated, the others are filled when they are selected.
+        """
+        active_tab = dpg.get_value(self.tab_bar)
+        for data in self.project_instance_data.values():
+            if data["tab"] != active_tab:
+                continue
+            console: ConsoleBuffer = data["console"]
+            if console.take_changes() or active_tab != self._shown_tab:
+                dpg.set_value(data["textbox"], console.tail(CONSOLE_TAIL_LINES))
+                self._shown_tab = active_tab
+            break
+
+    def console_out_lines(self, lines: list[str], identifier: Optional[str]):
+        self.project_instance_data[identifier]["console"].append(lines)
+
+    def mark_as_finished(self, job: Job):
+        console: ConsoleBuffer = self.project_instance_data[job.identifier]["console"]
+        if job.state != JobState.DONE:
+            console.append([f"Job {job.state} after {job.attempts} attempt(s)"])
+        else:
+            reference = self.reused_from.get(job.identifier)
+            wall_time = (job.result.wall_time if job.result is not None else job.wall_time) or 0.0
+            saved = self.sweep_report.add(job.identifier, wall_time, reference)
+            if saved is not None:
+                console.append(
+                    [
+                        f"Eigenmodes of {reference} reused: {wall_time:.1f} s instead of"
+                        f" {wall_time + saved:.1f} s for a full solve ({saved:.1f} s saved)"
+                    ]
                 )
+        console.flush()
+        if job.identifier in self.reused_from.values():
+            self.start_reusing_speeds(job)
+        if job.state == JobState.DONE:
+            self.collect(job.identifier)
+
+    def all_thread_complete(self):
+        with self._lock:
+            self._jobs_done = True  # finished by the frame loop, once the results are read
+
+    @property
+    def parser(self) -> ProcessPoolExecutor:
+        if self._parser is None:
+            # spawned, a forked copy of the GUI process would inherit its threads
+            self._parser = ProcessPoolExecutor(
+                PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._parser
+
+    def cache_key(self, name: str) -> str:
+        """
+        Key of the modes of a speed step in the eigenvector cache, unique for every analysis.
+        """
+        return f"{self.analysis_id}_{name}"
+
+    def collect(self, name: str):
+        """
+        Reads the modes of a finished speed step into the eigenvector cache in a worker process.
+        The first speed step builds the node index, the others wait for it.
+        """
+        with self._lock:
+            if self.node_index is None and self._parsing:
+                self._waiting.append(name)
+                return
+            self._parsing.add(name)
+            project_dir: Path = self.project_instance_data[name]["project_dir"]
+            future = self.parser.submit(
+                cache_modes,
+                project_dir / (name + ".frd"),
+                self.complex_step_no[name],
+                self.eigenvector_cache.cache_dir,
+                self.cache_key(name),
+                self.node_index,
+                self.node_subset_size,
+            )
+        future.add_done_callback(lambda future: self.modes_cached(name, future))
 
+    def modes_cached(self, name: str, future: Future):
+        """
+        Loads the modes of a speed step from the cache, in the thread of the worker pool. The result is only
+        published to the frame loop (see `update`), which matches the speed steps and redraws the plot.
+        The result file is deleted then, so the temporary files do not pile up.
+        """
+        console: ConsoleBuffer = self.project_instance_data[name]["console"]
+        frd_path: Path = self.project_instance_data[name]["project_dir"] / (name + ".frd")
+        speed = next(speed for project, speed, _ in self.project_files if project == name)
+        result: Optional[ComplexModalParseResult] = None
+        try:
+            if future.cancelled():
+                return  # the application exits
+            node_index = future.result()
+            with self._lock:
+                node_index = self.node_index or node_index
+            result = ComplexModalParseResult.read(
+                frd_path,
+                name,
+                speed,
+                self.complex_step_no[name],
+                self.eigenvector_cache,
+                self.cache_key(name),
+                node_index,
+                self.node_subset_size,
+            )
+            if not result.modes:
+                console.append([f"No modes of step {result.complex_step_no} found in the results"])
+                console.flush()
+                result = None
+            frd_path.unlink(missing_ok=True)
+        except Exception as error:
+            result = None
+            console.append([f"The results could not be read: {error!r}"])
+            console.flush()
+        finally:
+            with self._lock:
+                if result is not None:
+                    self.node_index = result.node_index
+                    self.speed_step_results.append(result)
+                    self._results_changed = True
+                self._parsing.discard(name)
+                waiting, self._waiting = self._waiting, []
+                if not future.cancelled():
+                    for waiting_name in waiting:
+                        self.collect(waiting_name)
+
+    def finish_if_done(self):
+        """
+        Once all jobs are done and their results are read, speed steps get added in an adaptive analysis,
+        or else the analysis is finished. Runs in the frame loop, no other thread touches the analysis then.
+        """
+        with self._lock:
+            if not self._jobs_done or self._parsing or self._waiting:
+                return
+            self._jobs_done = False
+        if self.refine():
+            return  # the added speed steps are running
+
+        dpg.hide_item(self.cancel_button)
         self.tempdir.cleanup()
-        self.plot_window.callback_analysis_complete()
-        dpg.show_item(self.show_results_button)
+        report = [self.sweep_report.summary()]
+        if self.refinement_round:
+            report.append(
+                f"Adaptive refinement: {len(self.project_files)} speeds"
+                f" after {self.refinement_round} refinement(s)"
+            )
+        dpg.set_value(self.sweep_report_text, "\n".join(line for line in report if line))
+        if not self.speed_step_results:
+            return
         dpg.show_item(self.save_results_button)
 
+    def refine(self) -> bool:
+        """
+        Adds speed steps where the results of an adaptive analysis are too coarse (see `refine_speeds`).
+        Returns whether speed steps were added.
+        """
+        if (
+            not dpg.get_value(self.adaptive_input)
+            or self._cancelled
+            or self.refinement_round >= dpg.get_value(self.max_rounds_input)
+            or len(self.speed_step_results) < 2
+        ):
+            return False
+        macs, frequencies, chains = self.tracked_modes()  # sorts the results by speed
+        speeds = refine_speeds(
+            [res.speed for res in self.speed_step_results],
+            frequencies,
+            macs,
+            chains,
+            min_mac=dpg.get_value(self.min_mac_input),
+            frequency_tolerance=dpg.get_value(self.frequency_tolerance_input),
+            speed_resolution=rpm_to_rad_s(dpg.get_value(self.speed_resolution_input)),
+            engine_orders=ENGINE_ORDERS,
+        )
+        if not speeds:
+            return False
+        self.refinement_round += 1
+        self.add_speed_steps(speeds)
+        return True
+
     def callback_confirm_save_results(self, sender, appdata):
         path = Path(appdata["file_path_name"])
         with open(path, "w") as f:
             data = self.modal_data
-            json.dump({"speeds_rpm": data[0], "modes_hz": data[1]}, f)
+            with self._lock:
+                # where the modes of every speed step are cached, to open the analysis again
+                speed_steps = [
+                    {
+                        "name": res.name,
+                        "speed_rad_s": res.speed,
+                        "complex_step_no": res.complex_step_no,
+                        "cache_key": res.cache_key,
+                        "cache_variant": res.cache_variant,
+                    }
+                    for res in self.speed_step_results
+                    if res.cache_key is not None
+                ]
+            json.dump(
+                {"speeds_rpm": data[0], "modes_hz": data[1], "speed_steps": speed_steps}, f
+            )
+
+    def callback_confirm_load_results(self, sender, appdata):
+        self.load_results(Path(appdata["file_path_name"]))
+
+    def load_results(self, path: Path):
+        """
+        Opens a saved analysis again. The modes of its speed steps are loaded from the eigenvector cache,
+        so they can be tracked (e.g. with another minimum MAC) and plotted without the result files.
+        """
+        if self.scheduler is not None and not all(
+            job.is_finished for job in self.scheduler.jobs.values()
+        ):
+            return  # an analysis is running
+        with open(path, "r") as f:
+            speed_steps = json.load(f).get("speed_steps", [])
+
+        results: list[ComplexModalParseResult] = []
+        node_index: Optional[NodeIndex] = None
+        for entry in speed_steps:
+            result = ComplexModalParseResult.from_cache(
+                self.eigenvector_cache,
+                entry["cache_key"],
+                entry["name"],
+                entry["speed_rad_s"],
+                entry["complex_step_no"],
+                entry["cache_variant"],
+                node_index,
+            )
+            if result is not None:
+                node_index = result.node_index
+                results.append(result)
+
+        with self._lock:
+            self.speed_step_results = results
+            self.node_index = node_index
+            self._macs = {}
+        missing = len(speed_steps) - len(results)
+        dpg.set_value(
+            self.sweep_report_text,
+            f"Loaded {len(results)} speed steps from {path.name}"
+            + (f", {missing} are no longer cached" if missing else ""),
+        )
+        if not results:
+            return
+        self.plot_window.callback_results_changed()
+        dpg.show_item(self.show_results_button)
+        dpg.show_item(self.save_results_button)
 
 
 class CampbellResultsWindow:
@@ -377,11 +814,19 @@ class CampbellResultsWindow:
                     dpg.mvYAxis, label="Eigenfrequency [Hz]"
                 )
 
-    def callback_analysis_complete(self):
+    def callback_results_changed(self):
+        """
+        Tracks the modes again with the new results and redraws the plot, if it is open.
+        """
         self.speeds, self.freqs = self.analysis.modal_data
+        if dpg.is_item_shown(self.window_id):
+            self.draw()
 
     def show(self):
         dpg.show_item(self.window_id)
+        self.draw()
+
+    def draw(self):
         dpg.delete_item(self.plot_axis, children_only=True)
         for main_mode_no, freq_list in self.freqs.items():
             dpg.add_line_series(
@@ -391,9 +836,9 @@ class CampbellResultsWindow:
                 tuple(freq for freq in freq_list if freq != -1),
                 parent=self.plot_axis,
             )
-        if self.analysis.speeds:
-            max_speed = rad_s_to_rpm(max(self.analysis.speeds))
-            for i in range(3):
+        if self.speeds:
+            max_speed = max(self.speeds)
+            for i in range(ENGINE_ORDERS):
                 dpg.add_line_series(
                     [0, max_speed],
                     [0, rpm_to_hz((i + 1) * max_speed)],
@@ -403,18 +848,81 @@ class CampbellResultsWindow:
 
 class ComplexModalParseResult:
     def __init__(
-        self, frd_content: str, name: str, speed: float, complex_step_no: int
+        self,
+        name: str,
+        speed: float,
+        complex_step_no: int,
+        eigenvectors: list[Eigenvector],
+        node_index: Optional[NodeIndex],
+        cache_key: Optional[str] = None,
+        cache_variant: str = "",
     ) -> None:
+        """
+        The modes of the complex frequency step of a speed step. `cache_key` and `cache_variant` tell where
+        they are kept in the eigenvector cache, if they are.
+        """
         self.name = name
         self.speed = speed
-        self._modal_assurance_matrix: np.ndarray
-
-        # Extract the modes from the Results file
-        self.modes = {
-            vec.mode_nr: vec
-            for vec in Eigenvector.from_result_blocks(ResultBlock.from_frd(frd_content))
-            if vec.step == complex_step_no
-        }
+        self.complex_step_no = complex_step_no
+        self.node_index = node_index
+        self.cache_key = cache_key
+        self.cache_variant = cache_variant
+        self.modes = {vec.mode_nr: vec for vec in eigenvectors}
+
+    @classmethod
+    def read(
+        cls,
+        frd_path: Path,
+        name: str,
+        speed: float,
+        complex_step_no: int,
+        cache: Optional[EigenvectorCache] = None,
+        cache_key: Optional[str] = None,
+        node_index: Optional[NodeIndex] = None,
+        node_subset_size: int = 0,
+    ) -> "ComplexModalParseResult":
+        """
+        Reads the modes from the result file, or from the cache (see `read_modes`).
+        """
+        eigenvectors, node_index = read_modes(
+            frd_path, complex_step_no, cache, cache_key, node_index, node_subset_size
+        )
+        return cls(
+            name,
+            speed,
+            complex_step_no,
+            eigenvectors,
+            node_index,
+            cache_key if cache is not None else None,
+            cache_variant(node_index),
+        )
+
+    @classmethod
+    def from_cache(
+        cls,
+        cache: EigenvectorCache,
+        cache_key: str,
+        name: str,
+        speed: float,
+        complex_step_no: int,
+        cache_variant: str = "",
+        node_index: Optional[NodeIndex] = None,
+    ) -> Optional["ComplexModalParseResult"]:
+        """
+        The modes of a speed step of a saved analysis, `None` if they are no longer cached.
+        """
+        eigenvectors, node_index = cached_modes(
+            cache, cache_key, complex_step_no, cache_variant, node_index
+        )
+        if eigenvectors is None:
+            return None
+        return cls(name, speed, complex_step_no, eigenvectors, node_index, cache_key, cache_variant)
+
+    def mode_shapes(self) -> tuple[list[int], np.ndarray]:
+        """
+        Returns the mode numbers and the stacked `(n_dof, n_modes)` mode shapes.
+        """
+        return list(self.modes.keys()), stack_mode_shapes(list(self.modes.values()))
 
 
 def rad_s_to_rpm(rad_s: float) -> float:
@@ -0,0 +1,285 @@
+import itertools
+import re
+import threading
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+WORD = re.compile(r"[A-Za-z_]\w*")
+PLAIN_TERM = re.compile(r"[A-Za-z_]+")
+FLUSH_LINES = 4096  # lines collected before they are written to the log file
+REFILTER_CHUNK_LINES = 65536
+
+
+class ConsoleQuery:
+    """
+    Console filter: keywords separated by "|", a line matches if it contains any of them.
+    """
+
+    def __init__(self, query: str) -> None:
+        self.text = query
+        self.terms = [term.strip() for term in query.split("|") if term.strip()]
+
+    def __bool__(self) -> bool:
+        return bool(self.terms)
+
+    def matches(self, line: str) -> bool:
+        return any(term in line for term in self.terms)
+
+    @property
+    def is_plain(self) -> bool:
+        """
+        Whether all keywords are plain words, which can be looked up in a `TokenIndex`.
+        """
+        return all(PLAIN_TERM.fullmatch(term) for term in self.terms)
+
+
+class TokenIndex:
+    """
+    Maps every word of a log to the numbers of the lines that contain it.
+    A plain keyword is part of a line exactly if it is part of one of the words of that line, so the
+    lines matching a query can be found from the (small) vocabulary instead of scanning the log.
+    """
+
+    def __init__(self) -> None:
+        self.line_numbers: dict[str, array] = {}
+
+    def add(self, line_number: int, line: str):
+        for word in set(WORD.findall(line)):
+            numbers = self.line_numbers.get(word)
+            if numbers is None:
+                numbers = self.line_numbers[word] = array("q")
+            numbers.append(line_number)
+
+    def lookup(self, query: ConsoleQuery) -> "np.ndarray":
+        """
+        Sorted numbers of the lines matching a plain query.
+        """
+        import numpy as np  # not needed before the first lookup
+
+        found = [
+            np.array(numbers, dtype=np.int64)
+            for word, numbers in self.line_numbers.items()
+            if any(term in word for term in query.terms)
+        ]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+
+class ConsoleBuffer:
+    """
+    Console model that can be fed from any thread. Only the last `max_lines` lines are kept in memory,
+    the full output can be written to `log_path` in batches. The GUI redraws from the buffer once per
+    frame at most, and only if something was added since the last redraw (see `take_changes`).
+
+    A filter query is matched against every new line as it comes in. Changing the query re-filters the
+    lines so far in a background thread. With `index_tokens`, the words of all lines are indexed, so
+    plain keyword queries over a long log file only read the matching lines.
+    """
+
+    def __init__(
+        self,
+        max_lines: int = 20_000,
+        log_path: Optional[Path] = None,
+        index_tokens: bool = False,
+    ) -> None:
+        self.max_lines = max_lines
+        self.index_tokens = index_tokens
+        self._lines: deque[str] = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._changed = False
+        self._query = ConsoleQuery("")
+        self._matches: deque[str] = deque(maxlen=max_lines)
+        self._refilter_matches: Optional[deque[str]] = None  # new matches while re-filtering
+        self._generation = 0  # of the query, outdated re-filter threads stop
+        self.match_count = 0
+        self._reset(log_path)
+
+    def _reset(self, log_path: Optional[Path]):
+        self._lines.clear()
+        self._matches.clear()
+        self._unwritten: list[str] = []
+        self.log_path = log_path
+        self.total_lines = 0
+        self.match_count = 0
+        self._log_size = 0
+        self._line_offsets = array("q")  # byte offset of every line in the log file
+        self.index = TokenIndex() if self.index_tokens and log_path else None
+
+    def append(self, lines: list[str]):
+        lines = [line if line.endswith("\n") else line + "\n" for line in lines]
+        with self._lock:
+            self._lines.extend(lines)
+            if self.log_path is not None:
+                self._unwritten.extend(lines)
+                if self.index is not None:
+                    for number, line in enumerate(lines, start=self.total_lines):
+                        self.index.add(number, line)
+                        self._line_offsets.append(self._log_size)
+                        self._log_size += len(line.encode("utf-8"))
+                if len(self._unwritten) >= FLUSH_LINES:
+                    self._write_unwritten()
+            self.total_lines += len(lines)
+
+            if self._query:
+                matches = [line for line in lines if self._query.matches(line)]
+                self.match_count += len(matches)
+                if self._refilter_matches is not None:
+                    self._refilter_matches.extend(matches)
+                else:
+                    self._matches.extend(matches)
+            self._changed = True
+
+    def clear(self, log_path: Optional[Path] = None):
+        """
+        Empties the buffer, the following lines are written to `log_path` (if given).
+        The filter query is kept.
+        """
+        self.flush()
+        with self._lock:
+            self._generation += 1
+            self._refilter_matches = None
+            self._reset(log_path)
+            if log_path is not None:
+                log_path.write_bytes(b"")
+            self._changed = True
+
+    def flush(self):
+        """
+        Writes the buffered lines to the log file.
+        """
+        with self._lock:
+            self._write_unwritten()
+
+    def _write_unwritten(self):
+        if self._unwritten and self.log_path is not None:
+            with open(self.log_path, "ab") as log:
+                log.write("".join(self._unwritten).encode("utf-8"))
+        self._unwritten = []
+
+    def take_changes(self) -> bool:
+        """
+        Returns whether lines were added (or the buffer was cleared) since the last call.
+        """
+        with self._lock:
+            changed, self._changed = self._changed, False
+        return changed
+
+    def lines(self) -> list[str]:
+        """
+        A copy of the lines in memory.
+        """
+        with self._lock:
+            return list(self._lines)
+
+    def tail(self, n_lines: int) -> str:
+        """
+        The last `n_lines` lines in memory as text.
+        """
+        with self._lock:
+            lines = list(itertools.islice(reversed(self._lines), n_lines))
+        return "".join(reversed(lines))
+
+    @property
+    def query(self) -> str:
+        return self._query.text
+
+    @property
+    def has_filter(self) -> bool:
+        return bool(self._query)
+
+    @property
+    def is_filtering(self) -> bool:
+        """
+        Whether the lines so far are still being re-filtered.
+        """
+        return self._refilter_matches is not None
+
+    def filtered_tail(self, n_lines: int) -> str:
+        """
+        The last `n_lines` lines matching the filter as text.
+        """
+        with self._lock:
+            lines = list(itertools.islice(reversed(self._matches), n_lines))
+        return "".join(reversed(lines))
+
+    def set_filter(self, query: str):
+        """
+        Changes the filter query. New lines are matched as they come in, the lines so far are re-filtered
+        in a background thread (from the log file, if there is one).
+        """
+        with self._lock:
+            self._write_unwritten()
+            self._generation += 1
+            self._query = ConsoleQuery(query)
+            self._matches = deque(maxlen=self.max_lines)
+            self.match_count = 0
+            self._changed = True
+            if not self._query:
+                self._refilter_matches = None
+                return
+            self._refilter_matches = deque(maxlen=self.max_lines)
+            arguments = (
+                self._generation,
+                self._query,
+                self.total_lines,
+                list(self._lines) if self.log_path is None else None,
+            )
+        threading.Thread(target=self._refilter, args=arguments, daemon=True).start()
+
+    def _refilter(
+        self,
+        generation: int,
+        query: ConsoleQuery,
+        n_lines: int,
+        memory_lines: Optional[list[str]],
+    ):
+        matches: deque[str] = deque(maxlen=self.max_lines)
+        count = 0
+        if memory_lines is not None:
+            for start in range(0, len(memory_lines), REFILTER_CHUNK_LINES):
+                if generation != self._generation:
+                    return
+                chunk = memory_lines[start : start + REFILTER_CHUNK_LINES]
+                found = [line for line in chunk if query.matches(line)]
+                matches.extend(found)
+                count += len(found)
+
+        elif self.index is not None and query.is_plain:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                numbers = self.index.lookup(query)
+                numbers = numbers[numbers < n_lines]
+                offsets = [self._line_offsets[number] for number in numbers[-self.max_lines :]]
+            count = len(numbers)
+            with open(self.log_path, "rb") as log:  # type: ignore
+                for offset in offsets:
+                    log.seek(offset)
+                    matches.append(log.readline().decode("utf-8"))
+
+        else:
+            # The lines are matched undecoded, only the matches get decoded
+            terms = [term.encode("utf-8") for term in query.terms]
+            with open(self.log_path, "rb") as log:  # type: ignore
+                lines = itertools.islice(log, n_lines)
+                while chunk := list(itertools.islice(lines, REFILTER_CHUNK_LINES)):
+                    if generation != self._generation:
+                        return
+                    found = [line for line in chunk if any(term in line for term in terms)]
+                    matches.extend(line.decode("utf-8") for line in found)
+                    count += len(found)
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            matches.extend(self._refilter_matches)  # type: ignore
+            self._matches = matches
+            self.match_count += count
+            self._refilter_matches = None
+            self._changed = True
@@ -1,23 +1,45 @@
 import dearpygui.dearpygui as dpg
 import os
 import time
-import threading
 from pathlib import Path
 import platformdirs
 import json
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
+from ccx_runner.ccx_logic.input_deck import InputDeck, load_deck
 from ccx_runner.ccx_logic.status import CalculixStatus
-from ccx_runner.gui.campbell_analysis import CampbellAnalysis
-from ccx_runner.ccx_logic.run_ccx import run_ccx
+from ccx_runner.gui.console import ConsoleBuffer
+
+# numpy, asyncio and the complex frequency analysis are imported on first use, to start up quickly
+# (see benchmarks/bench_startup.py)
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    import numpy as np
+    from ccx_runner.ccx_logic.run_ccx_async import BackgroundLoop
+    from ccx_runner.gui.campbell_analysis import CampbellAnalysis
+
+
+CONSOLE_TAIL_LINES = 1000  # lines shown in the console, the full output is in the log file
+STATUS_UPDATES_PER_SECOND = 4  # redraws of the overview table and residual plot
+PLOT_POINTS = 2000  # longer residual series are thinned out, so a redraw costs the same for any length
 
 
 class Hauptfenster:
     def __init__(self) -> None:
         self.startzeit = 0
-        self._console_out: list[str] = []
-        self.status = CalculixStatus(self)
-        dpg.set_exit_callback(self.kill_job)
+        self.console = ConsoleBuffer(index_tokens=True)
+        self.solver_status_changed = False
+        self._last_status_update = 0.0
+        # What is drawn in the overview table and residual plot, so only new data needs to be added
+        self._table_step = None
+        self._table_columns: tuple[str, ...] = ()
+        self._table_rows: list[tuple[int, list[int]]] = []  # (row, cells) per increment
+        self._plot_key = None
+        self._series: set[str] = set()
+        self._iteration_numbers: Optional["np.ndarray"] = None
+        self.status = CalculixStatus(self.mark_solver_status_changed, keep_lines=False)
+        dpg.set_exit_callback(self.callback_exit)
         # SETUP GUI
         with dpg.window(label="Example Window") as self.id:
             self.ccx_name_inp = dpg.add_input_text(label="Solver Pfad")
@@ -41,19 +63,21 @@ class Hauptfenster:
                 )
                 self.timer = dpg.add_text(show=False)
 
-            with dpg.tab_bar() as self.tab_bar:
+            with dpg.tab_bar(callback=self.callback_tab_selected) as self.tab_bar:
                 with dpg.tab(label="Console"):
                     self.console_filter_input = dpg.add_input_text(
-                        callback=self.update_console_output,
+                        callback=self.callback_console_filter_changed,
                         hint='Filter for keywords, use "|" for multiple',
                     )
+                    with dpg.group(horizontal=True):
+                        self.console_log_text = dpg.add_text(show=False)
+                        self.console_filter_status = dpg.add_text()
                     self.console_out = dpg.add_input_text(
                         multiline=True, readonly=True, height=-1
                     )
 
                 with dpg.tab(label="Overview"):
                     # Residual Plot
-                    self._plotted_keys = []
                     with dpg.plot(width=-1) as self.plot:
                         dpg.add_plot_legend()
 
@@ -70,8 +94,9 @@ class Hauptfenster:
                     )
                     self.table = dpg.add_table(height=-1)
 
-                with dpg.tab(label="Complex Frequency Analysis") as tab_id:
-                    self.cambell_analysis = CampbellAnalysis(self, tab_id)
+                # filled when it is opened for the first time
+                self.campbell_tab = dpg.add_tab(label="Complex Frequency Analysis")
+                self.cambell_analysis: Optional["CampbellAnalysis"] = None
 
         self.path_manager = ConfigManager("ccx_runner")
         last_known_paths = self.path_manager.load_paths()
@@ -81,44 +106,99 @@ class Hauptfenster:
 
         self.update_available_jobs()
         self.process = None
+        self.job_loop: Optional["BackgroundLoop"] = None  # started with the first job
+        self.job_future = None
+        self.finished_job: Optional["Future"] = None  # set in the loop thread, handled in `update`
+
+    def callback_tab_selected(self, sender, tab):
+        if tab == self.campbell_tab and self.cambell_analysis is None:
+            from ccx_runner.gui.campbell_analysis import CampbellAnalysis
+
+            dpg.push_container_stack(self.campbell_tab)
+            self.cambell_analysis = CampbellAnalysis(self, self.campbell_tab)
+            dpg.pop_container_stack()
+            self.cambell_analysis.callback_project_selected()
 
     def callback_project_selected(self):
-        self.cambell_analysis.callback_project_selected()
+        if self.cambell_analysis is not None:
+            self.cambell_analysis.callback_project_selected()
 
     def callback_project_directory_changed(self):
         pass
 
     def update_table_data(self):
+        """
+        Adds the rows of new increments to the table (newest on top). The last drawn row gets
+        refreshed, as its increment may have changed since.
+        """
         step = self.selected_step
         if not step:
             return
 
         # reset Table
-        dpg.delete_item(self.table, children_only=True)
-
-        data = step.tabular_data
-        for header in data.keys():
-            dpg.add_table_column(label=header, parent=self.table)
-        for zeile in zip(*data.values()):
-            with dpg.table_row(parent=self.table):
-                for eintrag in zeile:
-                    dpg.add_text(str(eintrag))
+        if step is not self._table_step or step.table_columns != self._table_columns:
+            dpg.delete_item(self.table, children_only=True)
+            self._table_step = step
+            self._table_columns = step.table_columns
+            self._table_rows = []
+            for header in self._table_columns:
+                dpg.add_table_column(label=header, parent=self.table)
+
+        start = max(len(self._table_rows) - 1, 0)
+        for nummer, zeile in enumerate(step.table_rows(start), start=start):
+            if nummer < len(self._table_rows):
+                _, zellen = self._table_rows[nummer]
+                for zelle, eintrag in zip(zellen, zeile):
+                    dpg.set_value(zelle, str(eintrag))
+                continue
+            neueste_zeile = self._table_rows[-1][0] if self._table_rows else 0
+            with dpg.table_row(parent=self.table, before=neueste_zeile) as row:
+                zellen = [dpg.add_text(str(eintrag)) for eintrag in zeile]
+            self._table_rows.append((row, zellen))
 
     def update_residual_plot(self):
-        if self.status.steps:
-            step = self.status.steps[-1]
-            for label, data in step.residuals.items():
-                if label not in self._plotted_keys:
-                    self._plotted_keys.append(label)
-                    dpg.add_line_series(
-                        tuple(range(len(data))),
-                        data,
-                        label=label,
-                        parent=self.plot_y_axis,
-                        tag=label,
-                    )
-                else:
-                    dpg.set_value(label, [tuple(range(len(data))), data])
+        """
+        Hands the residual series to the plot as views into the history of the step,
+        so nothing gets collected on the Python side. DearPyGui has no way to append to
+        a series, every redraw replaces (copies) the whole series. Series of more than
+        `PLOT_POINTS` points are therefore thinned out to every n-th point, always keeping
+        the latest one. DearPyGui reads the arrays as contiguous buffers, so the thinned
+        out points are copied into new arrays.
+        """
+        if not self.status.steps:
+            return
+        step = self.status.steps[-1]
+        key = (step.name, step.residual_key)
+        if key != self._plot_key:
+            self.reset_residual_plot()
+            self._plot_key = key
+
+        for label, y in step.residuals.items():
+            if label not in self._series:
+                self._series.add(label)
+                dpg.add_line_series(
+                    [], [], label=label, parent=self.plot_y_axis, tag=label
+                )
+            x = self.iteration_numbers(len(y))
+            stride = -(-len(y) // PLOT_POINTS)
+            if stride > 1:
+                # every n-th point counted back from the latest one
+                import numpy as np
+
+                x = np.ascontiguousarray(x[::-stride][::-1])
+                y = np.ascontiguousarray(y[::-stride][::-1])
+            dpg.set_value(label, [x, y])
+
+    def iteration_numbers(self, n: int) -> "np.ndarray":
+        """
+        The x values 0 ... n-1 of the residual plot, as a view into an array that grows by doubling.
+        """
+        if self._iteration_numbers is None or len(self._iteration_numbers) < n:
+            import numpy as np
+
+            size = 0 if self._iteration_numbers is None else len(self._iteration_numbers)
+            self._iteration_numbers = np.arange(max(n, 2 * size, 64), dtype=np.float64)
+        return self._iteration_numbers[:n]
 
     @property
     def selected_step(self):
@@ -142,6 +222,12 @@ class Hauptfenster:
         """
         return dpg.get_value(self.job_name_inp)
 
+    def mark_solver_status_changed(self, *args):
+        """
+        Progress listener of the parser, the table and plot get redrawn by the frame loop.
+        """
+        self.solver_status_changed = True
+
     def update_solver_status(self):
         """
         Redraw the Overview table and residual plot.
@@ -152,43 +238,47 @@ class Hauptfenster:
         self.update_table_data()
         self.update_residual_plot()
 
+    def callback_console_filter_changed(self):
+        self.console.set_filter(dpg.get_value(self.console_filter_input))
+
     def update_console_output(self):
-        query: str = dpg.get_value(self.console_filter_input)
-        if query == "":
-            dpg.set_value(self.console_out, "".join(self._console_out))
+        """
+        Shows the last lines of the console (that match the filter).
+        """
+        if not self.console.has_filter:
+            dpg.set_value(self.console_out, self.console.tail(CONSOLE_TAIL_LINES))
+            dpg.set_value(self.console_filter_status, "")
         else:
-            suchbegriffe = [wort.strip() for wort in query.split("|")]
             dpg.set_value(
-                self.console_out,
-                "".join(
-                    [
-                        line
-                        for line in self._console_out
-                        if any(suchbegriff in line for suchbegriff in suchbegriffe)
-                    ]
-                ),
+                self.console_out, self.console.filtered_tail(CONSOLE_TAIL_LINES)
+            )
+            dpg.set_value(
+                self.console_filter_status,
+                "filtering..."
+                if self.console.is_filtering
+                else f"{self.console.match_count} matching lines",
             )
 
     @property
-    def project_file_contents(self) -> Optional[str]:
+    def input_deck(self) -> Optional[InputDeck]:
         """
-        Returns the contents of the solver input file as a string.
+        The parsed solver input file, it is only parsed again once it changed.
         """
-        contents = None
         try:
-            with open(self.job_dir / (self.job_name + ".inp"), "r") as inp_file:
-                contents = inp_file.read()
-        except:
-            pass
-        return contents
+            return load_deck(self.job_dir / (self.job_name + ".inp"))
+        except OSError:
+            return None
 
     def reset_residual_plot(self):
-        self._plotted_keys = []
+        self._series = set()
+        self._plot_key = None
         dpg.delete_item(self.plot_y_axis, children_only=True)
 
     def add_console_text(self, text: str, *args):
-        self._console_out.append(text)
-        self.update_console_output()
+        self.console.append([text])
+
+    def add_console_lines(self, lines: list[str], *args):
+        self.console.append(lines)
 
     def update_available_jobs(self):
         try:
@@ -205,21 +295,32 @@ class Hauptfenster:
             items=items,
         )
 
-    def reset_after_process(self, identifier: Optional[str] = None):
+    def callback_job_done(self, future: "Future"):
+        """
+        Runs in the loop thread once the job has finished (ccx has exited). The run state is reset
+        by the frame loop, see `update`.
+        """
+        self.finished_job = future
+
+    def reset_after_process(self, future: "Future"):
+        if not future.cancelled() and future.exception() is not None:
+            # e.g. ccx could not be started
+            self.add_console_text(f"The job failed: {future.exception()!r}")
         dpg.hide_item(self.kill_job_btn)
         dpg.show_item(self.start_job_btn)
         self.process = None
+        self.job_future = None
+        self.finished_job = None
         self.status.running = False
+        self.console.flush()
+        self.mark_solver_status_changed()  # draw the final state
 
     def start_job(self):
-        if self.process is not None:  # Prevent starting multiple jobs
+        if self.job_future is not None:  # Prevent starting multiple jobs
             return
 
         self.reset_residual_plot()
-        dpg.show_item(self.kill_job_btn)
-        dpg.hide_item(self.start_job_btn)
-        dpg.set_value(self.console_out, "")
-        self._console_out.clear()
+        self.console.clear()
 
         # Check if paths are valid
         if not self.ccx_path.is_file():
@@ -232,6 +333,10 @@ class Hauptfenster:
                 f'The given path for the job directory does not point to a directory!:\n"{self.job_dir}"'
             )
             return
+        log_path = self.job_dir / (self.job_name + ".log")
+        self.console.clear(log_path)  # the console writes the log file
+        dpg.show_item(self.kill_job_btn)
+        dpg.hide_item(self.start_job_btn)
 
         self.path_manager.save_paths(
             {
@@ -240,38 +345,75 @@ class Hauptfenster:
             }
         )
 
-        self.status = CalculixStatus(self)
+        self.status = CalculixStatus(self.mark_solver_status_changed, keep_lines=False)
         self.startzeit = time.time()
         dpg.show_item(self.timer)
         self.status.running = True
 
-        self.thread = threading.Thread(
-            target=run_ccx,
-            daemon=True,
-            kwargs={
-                "process_holder": self,
-                "ccx_path": self.ccx_path,
-                "job_dir": self.job_dir,
-                "job_name": self.job_name,
-                "console_out": self.add_console_text,
-                "parser": self.status.parse,
-                "finished": self.reset_after_process,
-                "identifier": "main thread",
-            },
+        from ccx_runner.ccx_logic.run_ccx_async import BackgroundLoop, run_ccx_async
+
+        if self.job_loop is None:
+            self.job_loop = BackgroundLoop()
+        self.job_future = self.job_loop.submit(
+            run_ccx_async(
+                process_holder=self,
+                ccx_path=self.ccx_path,
+                job_dir=self.job_dir,
+                job_name=self.job_name,
+                console_out_lines=self.add_console_lines,
+                parser_lines=self.status.parse_lines,
+                identifier="main thread",
+                write_log=False,
+            )
         )
-        self.thread.start()
+        self.job_future.add_done_callback(self.callback_job_done)
+        dpg.set_value(self.console_log_text, f"Full log: {log_path}")
+        dpg.show_item(self.console_log_text)
 
     def kill_job(self):
-        if self.process:
-            self.process.terminate()
-            self.process.wait()
+        if self.job_loop is not None and self.job_future is not None:
+            self.job_loop.cancel(self.job_future)  # terminates ccx
+
+    def callback_exit(self):
+        """
+        Stops a running job and waits for ccx to exit, before the loop thread dies with the application.
+        """
+        process = self.process
+        self.kill_job()
+        if self.cambell_analysis is not None:
+            self.cambell_analysis.shutdown()
+        if process is None:
+            return
+
+        from ccx_runner.ccx_logic.run_ccx_async import TERMINATE_TIMEOUT
+
+        deadline = time.time() + TERMINATE_TIMEOUT
+        while (
+            process is not None
+            and process.returncode is None
+            and time.time() < deadline
+        ):
+            time.sleep(0.05)
 
     def update(self):
         """
         This runs for every frame
         """
+        if self.finished_job is not None:
+            self.reset_after_process(self.finished_job)
         if self.status.running:
             dpg.set_value(self.timer, f"{round(time.time() - self.startzeit,2)}s")
+        if self.console.take_changes():
+            self.update_console_output()
+        if (
+            self.solver_status_changed
+            and time.time() - self._last_status_update >= 1 / STATUS_UPDATES_PER_SECOND
+        ):
+            self.solver_status_changed = False
+            self._last_status_update = time.time()
+            self.update_solver_status()
+        if self.cambell_analysis is not None:
+            self.cambell_analysis.update()
 
 
 class ConfigManager:
@@ -1,7 +1,28 @@
-import dearpygui.dearpygui as dpg
-from ccx_runner.gui.hauptfenster import Hauptfenster
+import sys
+from typing import Optional
+
 
 def main():
+    if getattr(sys, "frozen", False):
+        # the worker processes of the Campbell analysis start this executable again
+        import multiprocessing
+
+        multiprocessing.freeze_support()
+    # any arguments select the headless command line interface, which must not import dearpygui
+    if len(sys.argv) > 1:
+        from ccx_runner.cli import cli
+
+        sys.exit(cli())
+    gui()
+
+
+def gui(frames: Optional[int] = None):
+    """
+    Runs the GUI until it is closed, or for the given number of `frames` (used by the startup benchmark).
+    """
+    import dearpygui.dearpygui as dpg
+    from ccx_runner.gui.hauptfenster import Hauptfenster
+
     # INIT GUI
     dpg.create_context()
     dpg.create_viewport(title='CalculiX Job Control', width=600, height=300)
@@ -11,11 +32,13 @@ def main():
     dpg.show_viewport()
     dpg.set_primary_window(hauptfenster.id, True)
 
-    while dpg.is_dearpygui_running():
+    frame = 0
+    while dpg.is_dearpygui_running() and (frames is None or frame < frames):
         dpg.render_dearpygui_frame()
         hauptfenster.update()
+        frame += 1
 
     dpg.destroy_context()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from ccx_runner.gui.console import ConsoleBuffer, ConsoleQuery, TokenIndex
+
+LOG = [
+    " increment 1 attempt 1",
+    " iteration 1",
+    " average force= 1.000000",
+    " time avg. forc= 1.000000",
+    " largest residual force= 0.001 in node 1234 and dof 2",
+    " largest increment of disp= 1.0e-02",
+    " no convergence",
+    " convergence",
+    " Température: 20 °C",
+    " *ERROR in e_c3d: nonpositive jacobian",
+    " node_set_1 nodes_total",
+    " 123abc def456",
+    "",
+]
+
+
+def matching_lines(lines: list[str], query: ConsoleQuery) -> list[int]:
+    return [number for number, line in enumerate(lines) if query.matches(line)]
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["force", "forc", "convergence", "residual|disp", "ERROR", "error", "node_set", "abc", "def", "mp", "c"],
+)
+def test_token_index_matches_a_scan(query):
+    lines = LOG * 3
+    index = TokenIndex()
+    for number, line in enumerate(lines):
+        index.add(number, line)
+    query = ConsoleQuery(query)
+    assert query.is_plain
+
+    assert index.lookup(query).tolist() == matching_lines(lines, query)
+
+
+def test_token_index_without_matches():
+    index = TokenIndex()
+    index.add(0, "increment 1")
+    assert index.lookup(ConsoleQuery("iteration")).tolist() == []
+
+
+def wait_for_filter(console: ConsoleBuffer):
+    deadline = time.time() + 10
+    while console.is_filtering and time.time() < deadline:
+        time.sleep(0.01)
+    assert not console.is_filtering
+
+
+@pytest.mark.parametrize("query", ["force|ERROR", "e_c3d", "1.000"])
+def test_refilter_from_the_log_file(tmp_path, query):
+    """
+    Plain queries are looked up in the index, the others scan the log. Both find the lines that were
+    dropped from memory already.
+    """
+    lines = [f"{line} {number}" for number in range(200) for line in LOG]
+    console = ConsoleBuffer(max_lines=50, log_path=tmp_path / "job.log", index_tokens=True)
+    console.append(lines)
+
+    console.set_filter(query)
+    wait_for_filter(console)
+
+    expected = [lines[number] + "\n" for number in matching_lines(lines, ConsoleQuery(query))]
+    assert console.match_count == len(expected)
+    assert console.filtered_tail(50) == "".join(expected[-50:])
@@ -0,0 +1,226 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from ccx_runner.ccx_logic.input_deck import SHARED_MODEL, InputDeck, Patch, SharedModel, load_deck
+
+DECK = """\
+*HEADING
+Rotor
+** a comment, not a card: *STEP
+*INCLUDE, INPUT=mesh.inp
+*Material, name=Steel
+*ELASTIC
+210000., 0.3
+*STEP
+*STATIC
+*DLOAD
+Eall, CENTRIF, 1000., 0., 0., 0., 1., 0., 0.
+*END STEP
+*STEP, PERTURBATION
+*FREQUENCY
+10
+*END STEP
+"""
+
+MESH = """\
+*NODE, NSET=Nall
+1, 0., 0., 0.
+2, 1., 0., 0.
+*INCLUDE, INPUT=sets.inp
+"""
+
+SETS = """\
+*ELSET, ELSET=Eall
+1
+"""
+
+
+@pytest.fixture
+def deck_path(tmp_path: Path) -> Path:
+    (tmp_path / "mesh.inp").write_text(MESH)
+    (tmp_path / "sets.inp").write_text(SETS)
+    path = tmp_path / "rotor.inp"
+    path.write_text(DECK)
+    return path
+
+
+def keywords(deck: InputDeck) -> list[str]:
+    return [card.keyword for card in deck.cards]
+
+
+def test_cards_in_read_order(deck_path):
+    deck = InputDeck(deck_path)
+
+    assert keywords(deck) == [
+        "*HEADING",
+        "*INCLUDE",
+        "*NODE",
+        "*INCLUDE",
+        "*ELSET",
+        "*MATERIAL",
+        "*ELASTIC",
+        "*STEP",
+        "*STATIC",
+        "*DLOAD",
+        "*END STEP",
+        "*STEP",
+        "*FREQUENCY",
+        "*END STEP",
+    ]
+    assert set(deck.files) == {deck_path, deck_path.parent / "mesh.inp", deck_path.parent / "sets.inp"}
+
+
+def test_find_and_parameters(deck_path):
+    deck = InputDeck(deck_path)
+
+    (material,) = deck.find("*material")
+    assert material.parameters == {"NAME": "Steel"}
+    assert deck.find("*end   step") == deck.find("*END STEP")
+    assert deck.find("*BOUNDARY") == []
+    assert material.read().startswith(b"*Material")
+    assert [line for _, _, line in deck.find("*ELASTIC")[0].data_lines()] == ["210000., 0.3"]
+
+
+def test_steps(deck_path):
+    deck = InputDeck(deck_path)
+
+    assert [step.number for step in deck.steps] == [1, 2]
+    assert [step.procedure.keyword for step in deck.steps] == ["*STATIC", "*FREQUENCY"]
+    assert deck.steps[1].cards[0].parameters == {"PERTURBATION": ""}
+
+
+def test_centrif_load_patch(deck_path, tmp_path):
+    deck = InputDeck(deck_path)
+    load = deck.centrif_loads["Eall"]
+
+    target = tmp_path / "patched" / "rotor.inp"
+    target.parent.mkdir()
+    deck.write(target, [load.patch(4000.0)])
+
+    # mesh.inp includes another file, so it gets copied next to the target
+    assert target.read_text() == DECK.replace(" 1000.", "4000.0").replace(
+        "INPUT=mesh.inp", "INPUT=rotor_mesh.inp"
+    )
+
+
+def test_write_copies_only_files_that_need_it(deck_path, tmp_path):
+    """
+    mesh.inp includes another file, so it is copied next to the target with its include pointing
+    back to the original sets.inp. Unpatched files without includes are not copied.
+    """
+    deck = InputDeck(deck_path)
+    target_dir = tmp_path / "out"
+    target_dir.mkdir()
+    target = target_dir / "variant.inp"
+
+    deck.write(target, [Patch(deck_path, 0, len("*HEADING"), "*HEADING, changed")])
+
+    assert sorted(os.listdir(target_dir)) == ["variant.inp", "variant_mesh.inp"]
+    written = InputDeck(target)
+    assert keywords(written) == keywords(deck)
+    assert written.cards[0].read().startswith(b"*HEADING, changed")
+    assert os.path.abspath(deck_path.parent / "sets.inp") in (target_dir / "variant_mesh.inp").read_text()
+
+
+def test_load_deck_is_cached_until_a_file_changes(deck_path):
+    deck = load_deck(deck_path)
+    assert load_deck(deck_path) is deck
+
+    (deck_path.parent / "sets.inp").write_text(SETS + "2\n")
+    changed = load_deck(deck_path)
+    assert changed is not deck
+    assert load_deck(deck_path) is changed
+
+
+def test_shared_model_variants(deck_path, tmp_path):
+    """
+    A variant only holds the steps and includes the shared model. Read from its own directory (like
+    ccx runs it), it is the whole deck with the patched load.
+    """
+    deck = InputDeck(deck_path)
+    directory = tmp_path / "sweep"
+    directory.mkdir()
+    model = SharedModel(deck, directory)
+
+    paths = [
+        model.write_variant(f"speed_{speed}", [deck.centrif_loads["Eall"].patch(speed)])
+        for speed in (100.0, 200.0)
+    ]
+
+    assert (directory / SHARED_MODEL).read_text().startswith("*HEADING")
+    assert "\n*STEP" not in (directory / SHARED_MODEL).read_text()
+    for path, speed in zip(paths, (100.0, 200.0)):
+        assert path == directory / path.stem / path.name
+        assert path.read_text().startswith(f"*INCLUDE, INPUT=../{SHARED_MODEL}\n*STEP")
+        variant = InputDeck(path)
+        assert keywords(variant)[1:] == keywords(deck)
+        assert variant.centrif_loads["Eall"].fields[2] == str(speed)
+        assert "*NODE" in keywords(variant) and "*ELSET" in keywords(variant)
+
+
+def test_shared_model_falls_back_to_full_copies(deck_path, tmp_path):
+    deck = InputDeck(deck_path)
+    model = SharedModel(deck, tmp_path)
+    mesh = deck.files[deck_path.parent / "mesh.inp"]
+    patch = Patch(mesh.path, 0, len("*NODE"), "*NODE")
+
+    assert not model.supports([patch])
+    path = model.write_variant("variant", [patch])
+
+    assert not path.read_text().startswith("*INCLUDE")
+    assert keywords(InputDeck(path)) == keywords(deck)
+
+
+def test_eigenmode_storage_patch(deck_path, tmp_path):
+    deck = InputDeck(deck_path)
+    target = tmp_path / "stored.inp"
+
+    deck.write(target, [deck.eigenmode_storage_patch()])
+
+    stored = InputDeck(target)
+    assert stored.find("*FREQUENCY")[0].parameters["STORAGE"] == "YES"
+    assert stored.eigenmode_storage_patch() is None
+    assert keywords(stored) == keywords(deck)
+
+
+def test_complex_frequency_step_patch(deck_path, tmp_path):
+    deck = InputDeck(deck_path)
+    assert not deck.has_complex_frequency_step
+    target = tmp_path / "complex.inp"
+
+    deck.write(target, [deck.complex_frequency_step_patch()])
+
+    complex_deck = InputDeck(target)
+    assert complex_deck.has_complex_frequency_step
+    assert complex_deck.complex_frequency_step_patch() is None
+    assert [step.procedure.keyword for step in complex_deck.steps] == [
+        "*STATIC",
+        "*FREQUENCY",
+        "*COMPLEX FREQUENCY",
+    ]
+
+
+def test_eigenmode_restart_variant(deck_path, tmp_path):
+    """
+    The restart variant runs only a complex frequency step at its own speed, on the eigenmodes stored
+    by an earlier run.
+    """
+    deck = InputDeck(deck_path)
+    model = SharedModel(deck, tmp_path)
+
+    step = deck.eigenmode_restart_step(deck.centrif_loads["Eall"], 3000.0)
+    path = model.write_restart_variant("restart", step)
+
+    variant = InputDeck(path)
+    assert [s.procedure.keyword for s in variant.steps] == ["*COMPLEX FREQUENCY"]
+    assert "CORIOLIS" in variant.steps[0].procedure.parameters
+    assert [card.keyword for card in variant.steps[0].cards] == [
+        "*STEP",
+        "*COMPLEX FREQUENCY",
+        "*DLOAD",
+        "*END STEP",
+    ]
+    assert variant.centrif_loads["Eall"].fields[2] == "3000.0"
+    assert "*MATERIAL" in keywords(variant)
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from ccx_runner.ccx_logic.speed_sweep import refine_speeds
+
+SPEEDS = [0.0, 100.0, 200.0, 300.0, 400.0]  # rad/s
+
+
+def sweep(frequencies_of_modes: list[list[float]]):
+    """
+    Frequencies per speed and clearly tracked modes (MAC 1 with themselves, 0 with the others).
+    """
+    frequencies = [np.array(column) for column in zip(*frequencies_of_modes)]
+    n_modes = len(frequencies_of_modes)
+    macs = [np.eye(n_modes) for _ in range(len(SPEEDS) - 1)]
+    chains = [[mode] * len(SPEEDS) for mode in range(n_modes)]
+    return frequencies, macs, chains
+
+
+def refine(frequencies, macs, chains, frequency_tolerance=1.0, speed_resolution=10.0):
+    return refine_speeds(
+        SPEEDS, frequencies, macs, chains, 0.9, frequency_tolerance, speed_resolution
+    )
+
+
+def test_resolved_sweep_is_not_refined():
+    frequencies, macs, chains = sweep([[1000.0] * 5, [2000.0, 2001.0, 2002.0, 2003.0, 2004.0]])
+    assert refine(frequencies, macs, chains) == []
+
+
+def test_ambiguous_link_is_refined():
+    frequencies, macs, chains = sweep([[1000.0] * 5, [1010.0] * 5])
+    macs[1] = np.array([[1.0, 0.95], [0.95, 1.0]])  # both modes look alike between speed 1 and 2
+
+    assert refine(frequencies, macs, chains) == [150.0]
+
+
+def test_ending_chain_is_refined():
+    frequencies, macs, chains = sweep([[1000.0] * 5, [2000.0] * 5])
+    chains = [[0, 0, 0, 0, 0], [1, 1, 1, -1, -1], [-1, -1, -1, 1, 1]]
+
+    assert refine(frequencies, macs, chains) == [250.0]
+
+
+def test_engine_order_crossing_is_refined():
+    # 30 Hz is crossed by engine order 2 and 3 below 100 rad/s and by engine order 1 below 200 rad/s
+    frequencies, macs, chains = sweep([[30.0] * 5])
+
+    assert refine(frequencies, macs, chains) == [50.0, 150.0]
+
+
+@pytest.mark.parametrize("frequency_tolerance, expected", [(1.0, [50.0, 150.0, 250.0, 350.0]), (5.0, [])])
+def test_curved_mode_is_refined(frequency_tolerance, expected):
+    # f = 1000 + 0.001 s^2 is off its chords over 100 rad/s by 2.5 Hz
+    frequencies, macs, chains = sweep([[1000.0 + 0.001 * speed**2 for speed in SPEEDS]])
+
+    assert refine(frequencies, macs, chains, frequency_tolerance) == expected
+
+
+def test_speed_resolution_stops_the_refinement():
+    frequencies, macs, chains = sweep([[30.0] * 5])
+
+    assert refine(frequencies, macs, chains, speed_resolution=100.0) == []
@@ -0,0 +1,81 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from ccx_runner.ccx_logic.complex_modal.Eigenvector import mac_matrix
+from ccx_runner.ccx_logic.complex_modal.tracking import linear_sum_assignment, track_modes
+
+
+def brute_force_cost(cost: np.ndarray) -> float:
+    if cost.shape[0] > cost.shape[1]:
+        cost = cost.T
+    n_rows, n_cols = cost.shape
+    return min(
+        cost[range(n_rows), cols].sum() for cols in itertools.permutations(range(n_cols), n_rows)
+    )
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (2, 2), (3, 3), (5, 5), (6, 6), (2, 5), (5, 3), (1, 4)])
+def test_assignment_matches_brute_force(shape):
+    rng = np.random.default_rng(sum(shape))
+    for _ in range(20):
+        cost = rng.random(shape)
+        rows, cols = linear_sum_assignment(cost)
+
+        assert len(rows) == len(cols) == min(shape)
+        assert len(set(rows)) == len(rows) and len(set(cols)) == len(cols)
+        assert np.all(np.diff(rows) > 0)
+        assert cost[rows, cols].sum() == pytest.approx(brute_force_cost(cost))
+
+
+def test_assignment_with_ties():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        cost = rng.integers(0, 3, size=(5, 5)).astype(float)
+        rows, cols = linear_sum_assignment(cost)
+        assert cost[rows, cols].sum() == pytest.approx(brute_force_cost(cost))
+
+
+def test_assignment_of_empty_matrix():
+    rows, cols = linear_sum_assignment(np.empty((0, 3)))
+    assert len(rows) == len(cols) == 0
+
+
+def test_assignment_beats_greedy():
+    # Row 0 takes column 0 greedily, which forces row 1 onto its expensive column
+    cost = np.array([[0.0, 0.1], [0.05, 1.0]])
+    rows, cols = linear_sum_assignment(cost)
+    assert cols.tolist() == [1, 0]
+
+
+def test_track_modes_through_a_crossing():
+    """
+    Two modes with different shapes cross between speeds 1 and 2. The modes of every speed are sorted
+    by frequency, so their indices swap at the crossing, but the chains have to follow the shapes.
+    """
+    rng = np.random.default_rng(1)
+    shape_a, shape_b, shape_c = rng.normal(size=(3, 30))
+    frequencies_a = [10.0, 12.0, 14.0, 16.0]  # rising
+    frequencies_b = [15.0, 14.5, 13.0, 12.0]  # falling, crosses a between speeds 1 and 2
+    frequency_c = 40.0
+
+    shapes, frequencies = [], []
+    for f_a, f_b in zip(frequencies_a, frequencies_b):
+        modes = sorted([(f_a, shape_a), (f_b, shape_b), (frequency_c, shape_c)], key=lambda m: m[0])
+        frequencies.append(np.array([f for f, _ in modes]))
+        shapes.append(np.column_stack([shape for _, shape in modes]))
+    macs = [mac_matrix(shapes[i], shapes[i + 1]) for i in range(len(shapes) - 1)]
+
+    chains = track_modes(macs, frequencies)
+
+    assert sorted(chains) == sorted([[0, 0, 1, 1], [1, 1, 0, 0], [2, 2, 2, 2]])
+
+
+def test_track_modes_starts_new_chains_below_min_mac():
+    frequencies = [np.array([10.0, 20.0]), np.array([10.5, 20.5])]
+    macs = [np.array([[0.95, 0.0], [0.0, 0.5]])]
+
+    chains = track_modes(macs, frequencies, min_mac=0.9)
+
+    assert chains == [[0, 0], [1, -1], [-1, 1]]